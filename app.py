@@ -1,15 +1,38 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, stream_with_context, abort
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
-from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload, load_only
+from datetime import datetime, date, timedelta
+from itertools import chain
+import csv
+import hashlib
+import io
 import os
+import threading
+import time
 from dotenv import load_dotenv
+from caller_cache import CallerProfileCache
+from caller_filter import KnownCallerFilter
+from fast_json import FastJSONProvider, dumps_compact
+from compression import available_codings, compress, StreamCompressor, CompressionStats
+from customer_search import query_tokens, search_document, fts5_match_query, tsquery
+from call_outcome_notes import format_call_outcome_notes, parse_call_outcome_notes, parse_amount, parse_date, TRACE_SEPARATOR
+from outcome_queue import OutcomeQueue, OutcomeQueueWorker
+from pagination import encode_cursor, decode_cursor
+from read_rows import RowShape
+from phone_numbers import normalize_phone_number, customer_phone_entries
+from ttl_cache import SingleFlightCache
+from serializers import (SerializedField, column_field, date_field, column_fields, date_fields, model_fields,
+                         serialize, serialize_many, serializer_for)
 
 load_dotenv()
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 
 # Add request logging
 @app.before_request
@@ -26,6 +49,45 @@ app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///crm
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'jwt-secret-change-in-production')
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
+app.config['CALLER_CACHE_MAX_ENTRIES'] = int(os.getenv('CALLER_CACHE_MAX_ENTRIES', '10000'))
+app.config['CALLER_CACHE_TTL_SECONDS'] = int(os.getenv('CALLER_CACHE_TTL_SECONDS', '300'))
+app.config['KNOWN_CALLER_FILTER_ENABLED'] = os.getenv('KNOWN_CALLER_FILTER_ENABLED', 'true').lower() == 'true'
+app.config['KNOWN_CALLER_FILTER_FP_RATE'] = float(os.getenv('KNOWN_CALLER_FILTER_FP_RATE', '0.01'))
+app.config['KNOWN_CALLER_FILTER_REFRESH_SECONDS'] = float(os.getenv('KNOWN_CALLER_FILTER_REFRESH_SECONDS', '2'))
+app.config['PHONE_DEFAULT_COUNTRY_CODE'] = os.getenv('PHONE_DEFAULT_COUNTRY_CODE', '1')
+app.config['CALLER_CACHE_WARMUP_ON_STARTUP'] = os.getenv('CALLER_CACHE_WARMUP_ON_STARTUP', 'true').lower() == 'true'
+app.config['CALLER_CACHE_WARMUP_DAYS_BEFORE'] = int(os.getenv('CALLER_CACHE_WARMUP_DAYS_BEFORE', '7'))
+app.config['CALLER_CACHE_WARMUP_DAYS_AFTER'] = int(os.getenv('CALLER_CACHE_WARMUP_DAYS_AFTER', '7'))
+app.config['POST_CALL_DEFAULT_MODE'] = os.getenv('POST_CALL_DEFAULT_MODE', 'sync')  # sync, async
+app.config['POST_CALL_QUEUE_PATH'] = os.getenv('POST_CALL_QUEUE_PATH', os.path.join(app.instance_path, 'post_call_queue.db'))
+app.config['POST_CALL_QUEUE_WORKERS'] = int(os.getenv('POST_CALL_QUEUE_WORKERS', '1'))
+app.config['POST_CALL_QUEUE_BATCH_SIZE'] = int(os.getenv('POST_CALL_QUEUE_BATCH_SIZE', '50'))
+app.config['PRE_CALL_BATCH_MAX_NUMBERS'] = int(os.getenv('PRE_CALL_BATCH_MAX_NUMBERS', '5000'))
+app.config['PRE_CALL_BATCH_CHUNK_SIZE'] = int(os.getenv('PRE_CALL_BATCH_CHUNK_SIZE', '500'))
+app.config['POST_CALL_BULK_MAX_ITEMS'] = int(os.getenv('POST_CALL_BULK_MAX_ITEMS', '5000'))
+app.config['POST_CALL_BULK_CHUNK_SIZE'] = int(os.getenv('POST_CALL_BULK_CHUNK_SIZE', '500'))
+app.config['API_PAGE_DEFAULT_LIMIT'] = int(os.getenv('API_PAGE_DEFAULT_LIMIT', '100'))
+app.config['API_PAGE_MAX_LIMIT'] = int(os.getenv('API_PAGE_MAX_LIMIT', '1000'))
+app.config['EXPORT_CHUNK_SIZE'] = int(os.getenv('EXPORT_CHUNK_SIZE', '1000'))
+
+# Most recent interactions embedded in customer_detail (the rest via the paginated interactions endpoint)
+app.config['CUSTOMER_DETAIL_INTERACTIONS_LIMIT'] = int(os.getenv('CUSTOMER_DETAIL_INTERACTIONS_LIMIT', '20'))
+
+# Response compression (gzip; brotli/zstd when the brotli/zstandard packages are installed)
+app.config['COMPRESSION_ENABLED'] = os.getenv('COMPRESSION_ENABLED', 'true').lower() == 'true'
+app.config['COMPRESSION_MIN_SIZE'] = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+app.config['COMPRESSION_LEVELS'] = {
+    'gzip': int(os.getenv('COMPRESSION_GZIP_LEVEL', '6')),
+    'br': int(os.getenv('COMPRESSION_BROTLI_LEVEL', '4')),
+    'zstd': int(os.getenv('COMPRESSION_ZSTD_LEVEL', '3'))
+}
+
+# Customer search
+app.config['CUSTOMER_SEARCH_DEFAULT_LIMIT'] = int(os.getenv('CUSTOMER_SEARCH_DEFAULT_LIMIT', '20'))
+app.config['CUSTOMER_SEARCH_MAX_LIMIT'] = int(os.getenv('CUSTOMER_SEARCH_MAX_LIMIT', '100'))
+
+# Dashboard stats: one aggregate per TTL per worker, shared by concurrent polls (0 disables caching)
+app.config['DASHBOARD_CACHE_TTL_SECONDS'] = float(os.getenv('DASHBOARD_CACHE_TTL_SECONDS', '10'))
 
 # Initialize extensions
 db = SQLAlchemy(app)
@@ -35,6 +97,85 @@ jwt = JWTManager(app)
 # Configure CORS - Simple setup that allows everything
 CORS(app)
 
+# Response compression
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/csv', 'text/plain'}
+
+compression_stats = CompressionStats()
+
+def compressed_stream(chunks, coding, level, route):
+    """Compress a streamed body chunk by chunk; stats are recorded when the stream ends"""
+    stream = StreamCompressor(coding, level)
+    bytes_in = bytes_out = 0
+    cpu_seconds = 0.0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            started = time.thread_time()
+            compressed = stream.compress(chunk)
+            cpu_seconds += time.thread_time() - started
+            bytes_in += len(chunk)
+            bytes_out += len(compressed)
+            if compressed:
+                yield compressed
+        started = time.thread_time()
+        trailer = stream.finish()
+        cpu_seconds += time.thread_time() - started
+        bytes_out += len(trailer)
+        yield trailer
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+        compression_stats.record(route, coding, bytes_in, bytes_out, cpu_seconds)
+
+@app.after_request
+def compress_response(response):
+    """
+    Compress JSON/NDJSON/CSV bodies with the best coding the client accepts.
+    Bodies under COMPRESSION_MIN_SIZE are sent as is; streamed bodies are
+    always compressed. A compressed body is a different representation, so
+    its ETag is made weak (conditional requests compare ETags weakly).
+    """
+    if (not app.config['COMPRESSION_ENABLED']
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES and response.status_code != 304
+            or 'Content-Encoding' in response.headers
+            or 'no-transform' in response.headers.get('Cache-Control', '')):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    coding = request.accept_encodings.best_match(available_codings())
+    if coding is None:
+        return response
+    
+    etag, weak = response.get_etag()
+    if response.status_code == 304:
+        # Answer in the form the client validated with
+        if etag and not weak and request.if_none_match.is_weak(etag):
+            response.set_etag(etag, weak=True)
+        return response
+    if response.status_code < 200 or response.status_code == 204:
+        return response
+    
+    route = request.url_rule.rule if request.url_rule else request.path
+    level = app.config['COMPRESSION_LEVELS'][coding]
+    if response.is_streamed:
+        response.response = compressed_stream(response.response, coding, level, route)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < app.config['COMPRESSION_MIN_SIZE']:
+            compression_stats.record_skip(route)
+            return response
+        started = time.thread_time()
+        compressed = compress(data, coding, level)
+        compression_stats.record(route, coding, len(data), len(compressed), time.thread_time() - started)
+        response.set_data(compressed)
+    
+    response.headers['Content-Encoding'] = coding
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
 # Models
 class Customer(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -70,6 +211,26 @@ class Customer(db.Model):
     loans = db.relationship('Loan', backref='customer', lazy=True)
     notes = db.relationship('CustomerNote', backref='customer', lazy=True)
     interactions = db.relationship('CustomerInteraction', backref='customer', lazy=True)
+    phone_numbers = db.relationship('CustomerPhoneNumber', backref='customer', lazy=True, cascade='all, delete-orphan')
+    
+    __table_args__ = (
+        # Keyset pagination in created_at order
+        db.Index('ix_customer_created_id', 'created_at', 'id'),
+    )
+
+class CustomerPhoneNumber(db.Model):
+    # Every number a customer can call from, E.164-normalized and indexed for caller lookup.
+    # Maintained from Customer.primary_phone_number / transfer_phone_number on flush.
+    id = db.Column(db.Integer, primary_key=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=False, index=True)
+    phone_number = db.Column(db.String(20), nullable=False)
+    source = db.Column(db.String(20), nullable=False)  # primary, transfer
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('customer_id', 'phone_number', 'source', name='uq_customer_phone_number'),
+        db.Index('ix_customer_phone_number_lookup', 'phone_number', 'source', 'customer_id'),
+    )
 
 class Vehicle(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -108,72 +269,1964 @@ class Loan(db.Model):
     interest_rate = db.Column(db.Float, nullable=True)
     term_months = db.Column(db.Integer, nullable=True)
     monthly_payment = db.Column(db.Float, nullable=True)
-    balance_remaining = db.Column(db.Float, nullable=True)
-    status = db.Column(db.String(20), default='active')  # active, paid_off, defaulted, repo
+    # Counted in portfolio_counter: active_history keeps the previous value when
+    # an unloaded attribute is set, so the counters can subtract it
+    balance_remaining = db.column_property(db.Column(db.Float, nullable=True), active_history=True)
+    status = db.column_property(db.Column(db.String(20), default='active'), active_history=True)  # active, paid_off, defaulted, repo
     next_payment_date = db.Column(db.Date, nullable=True)
     origination_date = db.Column(db.Date, nullable=True)
-    days_past_due = db.Column(db.Integer, default=0)
+    days_past_due = db.column_property(db.Column(db.Integer, default=0), active_history=True)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    payments = db.relationship('Payment', backref='loan', lazy=True)
+    notes = db.relationship('LoanNote', backref='loan', lazy=True)
+    
+    __table_args__ = (
+        # Latest loan per customer (pre-call lookup)
+        db.Index('ix_loan_customer_created', 'customer_id', 'created_at'),
+        # Keyset pagination in created_at order
+        db.Index('ix_loan_created_id', 'created_at', 'id'),
+        # Loan list filters and sort orders (see LOAN_LIST_INDEX_CHECKS)
+        db.Index('ix_loan_due_date_id', 'due_date', 'id'),
+        db.Index('ix_loan_status_due_date', 'status', 'due_date', 'id'),
+        db.Index('ix_loan_due_amount_id', 'due_amount', 'id'),
+        db.Index('ix_loan_days_past_due_id', 'days_past_due', 'id'),
+        db.Index('ix_loan_missed_installments_id', 'no_of_missed_installments', 'id'),
+        db.Index('ix_loan_grace_period_id', 'grace_period_date', 'id'),
+        db.Index('ix_loan_product_status', 'product_name', 'status'),
+    )
+
+class Payment(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    loan_id = db.Column(db.Integer, db.ForeignKey('loan.id'), nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+    payment_date = db.Column(db.Date, nullable=False)
+    payment_method = db.Column(db.String(20), nullable=False)  # cash, check, card, ach
+    reference_number = db.Column(db.String(50), nullable=True)
+    notes = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class CustomerNote(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=False)
+    note = db.Column(db.Text, nullable=False)
+    created_by = db.Column(db.String(100), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class LoanNote(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    loan_id = db.Column(db.Integer, db.ForeignKey('loan.id'), nullable=False)
+    note = db.Column(db.Text, nullable=False)
+    created_by = db.Column(db.String(100), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class CustomerInteraction(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=False)
+    creation_date = db.Column(db.DateTime, nullable=False)
+    last_updated_date = db.Column(db.Date, nullable=False)
+    source = db.Column(db.String(100), nullable=False)
+    status = db.Column(db.String(50), nullable=False)
+    notes = db.Column(db.Text, nullable=True)
+    # Post-call outcome idempotency: the vendor's call id and what the call changed,
+    # so a replayed outcome can be answered with the original response
+    call_identifier = db.Column(db.String(100), nullable=True)
+    customer_updated = db.Column(db.Boolean, nullable=True)
+    loan_updated = db.Column(db.Boolean, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    call_outcome = db.relationship('CallOutcome', backref='interaction', uselist=False, lazy=True,
+                                   cascade='all, delete-orphan')
+    
+    __table_args__ = (
+        # Latest interaction per customer (pre-call lookup)
+        db.Index('ix_customer_interaction_customer_created', 'customer_id', 'created_at'),
+        # A customer's interactions newest first (customer_detail, paginated interactions list)
+        db.Index('ix_customer_interaction_customer_creation', 'customer_id', 'creation_date', 'id'),
+        db.Index('uq_customer_interaction_call_identifier', 'call_identifier', unique=True),
+    )
+
+class CallOutcome(db.Model):
+    # Structured fields of a post-call outcome, one row per outcome interaction.
+    # The interaction's notes keep the human-readable summary for the agent UI.
+    id = db.Column(db.Integer, primary_key=True)
+    interaction_id = db.Column(db.Integer, db.ForeignKey('customer_interaction.id'), unique=True, nullable=False)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=False, index=True)
+    call_date = db.Column(db.DateTime, nullable=False)
+    disposition = db.Column(db.String(50), nullable=True)
+    call_type = db.Column(db.String(100), nullable=True)
+    call_duration = db.Column(db.String(50), nullable=True)
+    disposition_trace = db.Column(db.JSON(none_as_null=True), nullable=True)
+    agreed_payment_amount = db.Column(db.Float, nullable=True)
+    pay_later_date = db.Column(db.Date, nullable=True)
+    call_end_status = db.Column(db.String(100), nullable=True)
+    dialing_long_code = db.Column(db.String(100), nullable=True)
+    dialing_short_code = db.Column(db.String(50), nullable=True)
+    dialing_details = db.Column(db.Text, nullable=True)
+    outcome_note = db.Column(db.Text, nullable=True)
+    additional_notes = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_call_outcome_disposition_date', 'disposition', 'call_date'),
+        db.Index('ix_call_outcome_call_date', 'call_date'),
+        db.Index('ix_call_outcome_agreed_amount', 'agreed_payment_amount'),
+    )
+
+class CallerCard(db.Model):
+    # Denormalized pre-call profile: one row per phone number with exactly the
+    # user_info + metadata fields of fetch_user_profile_pre_call. Rewritten in the
+    # same transaction as any Customer/Loan/CustomerInteraction write (see
+    # refresh_caller_cards); column names match pre_call_profile_query() labels.
+    phone_number = db.Column(db.String(20), primary_key=True)
+    phone_source = db.Column(db.String(20), nullable=False)
+    customer_id = db.Column(db.Integer, nullable=False, index=True)
+    account_number = db.Column(db.String(50), nullable=True)
+    first_name = db.Column(db.String(100), nullable=True)
+    last_name = db.Column(db.String(100), nullable=True)
+    address_line_1 = db.Column(db.Text, nullable=True)
+    address_line_2 = db.Column(db.Text, nullable=True)
+    zip_code = db.Column(db.Integer, nullable=True)
+    city = db.Column(db.String(100), nullable=True)
+    state = db.Column(db.String(50), nullable=True)
+    ssn = db.Column(db.Integer, nullable=True)
+    dob = db.Column(db.Date, nullable=True)
+    primary_phone_number = db.Column(db.BigInteger, nullable=True)
+    email_address = db.Column(db.String(120), nullable=True)
+    customer_number = db.Column(db.Integer, nullable=True)
+    record_type = db.Column(db.String(50), nullable=True)
+    borrower_first_name = db.Column(db.String(100), nullable=True)
+    borrower_last_name = db.Column(db.String(100), nullable=True)
+    is_eligible_to_call = db.Column(db.Boolean, nullable=True)
+    transfer_phone_number = db.Column(db.BigInteger, nullable=True)
+    transfer_ip_address = db.Column(db.String(45), nullable=True)
+    product_name = db.Column(db.String(100), nullable=True)
+    due_amount = db.Column(db.Float, nullable=True)
+    no_of_missed_installments = db.Column(db.Integer, nullable=True)
+    contractual_installment_amount = db.Column(db.Float, nullable=True)
+    interest_late_fee = db.Column(db.Float, nullable=True)
+    minimum_amount = db.Column(db.Float, nullable=True)
+    acceptable_pay_later_date = db.Column(db.Date, nullable=True)
+    acceptable_already_paid_date = db.Column(db.Date, nullable=True)
+    grace_period_date = db.Column(db.Date, nullable=True)
+    due_date = db.Column(db.Date, nullable=True)
+    interaction_creation_date = db.Column(db.DateTime, nullable=True)
+    interaction_last_updated_date = db.Column(db.Date, nullable=True)
+    interaction_source = db.Column(db.String(100), nullable=True)
+    interaction_status = db.Column(db.String(50), nullable=True)
+    interaction_notes = db.Column(db.Text, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class PortfolioCounter(db.Model):
+    # Running totals read by the dashboard and health endpoints instead of
+    # counting the large tables: customers, loans, loans:<status>,
+    # past_due_loans, balance_remaining and interactions. Adjusted in the same
+    # transaction as every Customer/Loan/CustomerInteraction write (see
+    # track_portfolio_counters); reconcile_portfolio_counters() recomputes them.
+    name = db.Column(db.String(100), primary_key=True)
+    value = db.Column(db.Float, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# Schema upgrades for existing databases
+def upgrade_schema():
+    """
+    Add the columns and indexes models gained after a database was created
+    (db.create_all() only creates missing tables). New columns must be
+    nullable. Returns a description of each change applied.
+    """
+    applied = []
+    inspector = db.inspect(db.engine)
+    with db.engine.begin() as conn:
+        preparer = conn.dialect.identifier_preparer
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    conn.execute(db.text(
+                        f"ALTER TABLE {preparer.format_table(table)} "
+                        f"ADD COLUMN {preparer.format_column(column)} {column.type.compile(dialect=conn.dialect)}"
+                    ))
+                    applied.append(f"column {table.name}.{column.name}")
+            
+            existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(conn)
+                    applied.append(f"index {index.name}")
+    return applied
+
+# Caller profile cache (serialized pre-call responses, keyed by phone number)
+caller_profile_cache = CallerProfileCache(
+    max_entries=app.config['CALLER_CACHE_MAX_ENTRIES'],
+    ttl_seconds=app.config['CALLER_CACHE_TTL_SECONDS']
+)
+
+# Negative-lookup filter over every indexed phone number
+known_caller_filter = KnownCallerFilter(
+    false_positive_rate=app.config['KNOWN_CALLER_FILTER_FP_RATE'],
+    refresh_seconds=app.config['KNOWN_CALLER_FILTER_REFRESH_SECONDS']
+)
+
+def mark_customer_touched(customer_id, session=None):
+    """Record that customer_id was written in the current transaction.
+
+    ORM changes are picked up automatically after each flush (once new rows
+    have their ids); code that writes with Core statements must call this so
+    caller cards are refreshed and caches invalidated on commit.
+    """
+    if customer_id is None:
+        return
+    session = session if session is not None else db.session
+    session.info.setdefault('touched_customer_ids', set()).add(customer_id)
+
+@event.listens_for(db.session, 'after_flush')
+def track_touched_customers(session, flush_context):
+    """Collect the customers affected by the flushed Customer/Loan/Interaction changes"""
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Customer):
+            mark_customer_touched(obj.id, session)
+        elif isinstance(obj, (Loan, CustomerInteraction)):
+            mark_customer_touched(obj.customer_id, session)
+            # A loan or interaction moved to another customer affects both
+            for old_customer_id in db.inspect(obj).attrs.customer_id.history.deleted:
+                mark_customer_touched(old_customer_id, session)
+
+def sync_customer_phone_numbers(customer):
+    """Bring customer.phone_numbers in line with the customer's phone columns"""
+    wanted = customer_phone_entries(
+        customer.primary_phone_number,
+        customer.transfer_phone_number,
+        app.config['PHONE_DEFAULT_COUNTRY_CODE']
+    )
+    existing = {(p.phone_number, p.source): p for p in customer.phone_numbers}
+    for key, phone in existing.items():
+        if key not in wanted:
+            customer.phone_numbers.remove(phone)
+    for phone_number, source in wanted:
+        if (phone_number, source) not in existing:
+            customer.phone_numbers.append(CustomerPhoneNumber(phone_number=phone_number, source=source))
+            # Added to the known caller filter once committed
+            db.object_session(customer).info.setdefault('indexed_phone_numbers', set()).add(phone_number)
+
+@event.listens_for(db.session, 'before_flush')
+def sync_phone_numbers(session, flush_context, instances):
+    """Keep the phone number index in step with new and updated customers"""
+    for obj in chain(session.new, session.dirty):
+        if not isinstance(obj, Customer) or obj in session.deleted:
+            continue
+        state = db.inspect(obj)
+        if (state.pending
+                or state.attrs.primary_phone_number.history.has_changes()
+                or state.attrs.transfer_phone_number.history.has_changes()):
+            sync_customer_phone_numbers(obj)
+
+def rebuild_phone_index(chunk_size=1000):
+    """Regenerate the customer_phone_number table from Customer rows; returns rows written"""
+    country_code = app.config['PHONE_DEFAULT_COUNTRY_CODE']
+    db.session.execute(db.delete(CustomerPhoneNumber))
+    
+    written = 0
+    batch = []
+    rows = db.session.execute(
+        db.select(Customer.id, Customer.primary_phone_number, Customer.transfer_phone_number)
+        .execution_options(yield_per=chunk_size)
+    )
+    for customer_id, primary_phone_number, transfer_phone_number in rows:
+        for phone_number, source in customer_phone_entries(primary_phone_number, transfer_phone_number, country_code):
+            batch.append({
+                'customer_id': customer_id,
+                'phone_number': phone_number,
+                'source': source,
+                'created_at': datetime.utcnow()
+            })
+        if len(batch) >= chunk_size:
+            db.session.execute(db.insert(CustomerPhoneNumber), batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(db.insert(CustomerPhoneNumber), batch)
+        written += len(batch)
+    
+    db.session.commit()
+    caller_profile_cache.clear()
+    if known_caller_filter.ready:
+        load_known_caller_filter()
+    return written
+
+def load_known_caller_filter():
+    """(Re)build the known caller filter from the phone index"""
+    count = db.session.execute(db.select(db.func.count(CustomerPhoneNumber.id))).scalar() or 0
+    rows = db.session.execute(
+        db.select(CustomerPhoneNumber.id, CustomerPhoneNumber.phone_number)
+        .execution_options(yield_per=5000)
+    )
+    known_caller_filter.build(rows, count)
+    return known_caller_filter.stats()
+
+def refresh_known_caller_filter():
+    """
+    Build the filter on first use, then periodically pick up numbers indexed
+    by other worker processes (rows with ids near or above the last one seen).
+    """
+    if not app.config['KNOWN_CALLER_FILTER_ENABLED']:
+        return
+    if known_caller_filter.needs_rebuild():
+        load_known_caller_filter()
+        return
+    if not known_caller_filter.needs_sync():
+        return
+    
+    max_id = db.session.execute(db.select(db.func.max(CustomerPhoneNumber.id))).scalar() or 0
+    if max_id < known_caller_filter.high_water_id:
+        # The index was rebuilt elsewhere and ids restarted
+        load_known_caller_filter()
+        return
+    known_caller_filter.sync(db.session.execute(
+        db.select(CustomerPhoneNumber.id, CustomerPhoneNumber.phone_number)
+        .where(CustomerPhoneNumber.id > known_caller_filter.sync_from_id)
+    ))
+
+def is_unknown_caller(phone_number):
+    """True when the filter proves phone_number has no customer (no DB read needed)"""
+    if not app.config['KNOWN_CALLER_FILTER_ENABLED']:
+        return False
+    refresh_known_caller_filter()
+    return known_caller_filter.definitely_missing(phone_number)
+
+@event.listens_for(db.session, 'after_commit')
+def invalidate_touched_customers(session):
+    """Drop cached caller profiles for customers and caller cards written in the committed transaction"""
+    for customer_id in session.info.pop('touched_customer_ids', ()):
+        caller_profile_cache.invalidate_customer(customer_id)
+    rewritten_phone_numbers = session.info.pop('rewritten_phone_numbers', None)
+    if rewritten_phone_numbers:
+        caller_profile_cache.invalidate_keys(rewritten_phone_numbers)
+    for phone_number in session.info.pop('indexed_phone_numbers', ()):
+        known_caller_filter.add(phone_number)
+
+@event.listens_for(db.session, 'after_rollback')
+def discard_touched_customers(session):
+    session.info.pop('touched_customer_ids', None)
+    session.info.pop('rewritten_phone_numbers', None)
+    session.info.pop('indexed_phone_numbers', None)
+
+# Portfolio counters: the dashboard/health totals, kept current by each write
+PORTFOLIO_COUNTER_NAMES = ('customers', 'loans', 'past_due_loans', 'balance_remaining', 'interactions')
+LOAN_COUNTED_COLUMNS = ('status', 'days_past_due', 'balance_remaining')
+
+def loan_status_counter(status):
+    return f"loans:{status or ''}"
+
+def add_loan_counts(deltas, status, days_past_due, balance_remaining, sign):
+    """Add (sign=1) or remove (sign=-1) one loan with these values from the counter deltas"""
+    for name, value in (
+        ('loans', 1),
+        (loan_status_counter(status), 1),
+        ('past_due_loans', 1 if (days_past_due or 0) > 0 else 0),
+        ('balance_remaining', balance_remaining or 0)
+    ):
+        if value:
+            deltas[name] = deltas.get(name, 0) + sign * value
+
+def add_counter_deltas(session, deltas):
+    """Queue counter changes for this transaction (applied on commit, dropped on rollback)"""
+    pending = session.info.setdefault('portfolio_counter_deltas', {})
+    for name, delta in deltas.items():
+        pending[name] = pending.get(name, 0) + delta
+
+def committed_value(state, key):
+    """The attribute's value as loaded from the database, before this flush's changes"""
+    history = state.attrs[key].history
+    if history.deleted:
+        return history.deleted[0]
+    return history.unchanged[0] if history.unchanged else None
+
+@event.listens_for(db.session, 'before_flush')
+def load_counted_loan_values(session, flush_context, instances):
+    """Deleted loans are subtracted with their stored values; make sure they are loaded"""
+    for obj in session.deleted:
+        if isinstance(obj, Loan):
+            for key in LOAN_COUNTED_COLUMNS:
+                getattr(obj, key)
+
+@event.listens_for(db.session, 'after_flush')
+def track_portfolio_counters(session, flush_context):
+    """Turn the flushed Customer/Loan/CustomerInteraction inserts, updates and deletes into counter deltas"""
+    deltas = {}
+    for objs, sign in ((session.new, 1), (session.deleted, -1)):
+        for obj in objs:
+            if isinstance(obj, Customer):
+                deltas['customers'] = deltas.get('customers', 0) + sign
+            elif isinstance(obj, CustomerInteraction):
+                deltas['interactions'] = deltas.get('interactions', 0) + sign
+            elif isinstance(obj, Loan):
+                if sign > 0:
+                    add_loan_counts(deltas, obj.status, obj.days_past_due, obj.balance_remaining, 1)
+                else:
+                    state = db.inspect(obj)
+                    add_loan_counts(deltas, *(committed_value(state, key) for key in LOAN_COUNTED_COLUMNS), -1)
+    for obj in session.dirty:
+        if not isinstance(obj, Loan) or obj in session.deleted:
+            continue
+        state = db.inspect(obj)
+        if any(state.attrs[key].history.has_changes() for key in LOAN_COUNTED_COLUMNS):
+            add_loan_counts(deltas, *(committed_value(state, key) for key in LOAN_COUNTED_COLUMNS), -1)
+            add_loan_counts(deltas, obj.status, obj.days_past_due, obj.balance_remaining, 1)
+    if deltas:
+        add_counter_deltas(session, deltas)
+
+def apply_counter_deltas(connection, deltas):
+    """Add deltas to the stored counters (one upsert; rows for new loan statuses are created)"""
+    rows = [{'name': name, 'value': delta} for name, delta in sorted(deltas.items()) if delta]
+    if not rows:
+        return
+    table = PortfolioCounter.__table__
+    now = datetime.utcnow()
+    if connection.dialect.name in ('sqlite', 'postgresql'):
+        if connection.dialect.name == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        statement = insert(table).values(updated_at=now)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.name],
+            set_={'value': table.c.value + statement.excluded.value, 'updated_at': now}
+        ), rows)
+        return
+    for row in rows:
+        updated = connection.execute(
+            db.update(table).where(table.c.name == row['name'])
+            .values(value=table.c.value + row['value'], updated_at=now)
+        ).rowcount
+        if not updated:
+            connection.execute(db.insert(table).values(**row, updated_at=now))
+
+@event.listens_for(db.session, 'after_rollback')
+def discard_portfolio_counters(session):
+    session.info.pop('portfolio_counter_deltas', None)
+
+def compute_portfolio_counters(connection):
+    """Every counter recomputed from the tables (full scans; for reconciliation)"""
+    counters = dict.fromkeys(PORTFOLIO_COUNTER_NAMES, 0)
+    counters['customers'] = connection.execute(db.select(db.func.count()).select_from(Customer.__table__)).scalar()
+    counters['interactions'] = connection.execute(
+        db.select(db.func.count()).select_from(CustomerInteraction.__table__)
+    ).scalar()
+    loan = Loan.__table__
+    rows = connection.execute(db.select(
+        loan.c.status,
+        db.func.count(),
+        db.func.sum(db.case((loan.c.days_past_due > 0, 1), else_=0)),
+        db.func.sum(loan.c.balance_remaining)
+    ).group_by(loan.c.status))
+    for status, count, past_due, balance in rows:
+        counters['loans'] += count
+        counters[loan_status_counter(status)] = count
+        counters['past_due_loans'] += past_due or 0
+        counters['balance_remaining'] += balance or 0
+    return counters
+
+def reconcile_portfolio_counters(connection, tolerance=0.005):
+    """
+    Recompute every counter and overwrite the stored ones. Concurrent
+    writers wait until this transaction commits and then add their deltas
+    on top. Returns {name: (stored, actual)} for the counters that drifted
+    by more than tolerance.
+    """
+    table = PortfolioCounter.__table__
+    if connection.dialect.name == 'postgresql':
+        connection.execute(db.text("LOCK TABLE portfolio_counter IN SHARE ROW EXCLUSIVE MODE"))
+    stored = {name: value for name, value in connection.execute(db.select(table.c.name, table.c.value))}
+    # Delete first: on SQLite the write lock keeps other writers out until the new values are in
+    connection.execute(db.delete(table))
+    actual = compute_portfolio_counters(connection)
+    now = datetime.utcnow()
+    connection.execute(db.insert(table), [
+        {'name': name, 'value': value, 'updated_at': now} for name, value in sorted(actual.items())
+    ])
+    return {
+        name: (stored.get(name), actual.get(name, 0))
+        for name in sorted(set(stored) | set(actual))
+        if abs((stored.get(name) or 0) - actual.get(name, 0)) > tolerance
+    }
+
+@event.listens_for(db.metadata, 'after_create')
+def create_portfolio_counters(target, connection, **kw):
+    """Fill the counters from the existing rows when the table is new (or was never filled)"""
+    if connection.execute(db.select(PortfolioCounter.name).limit(1)).first() is None:
+        reconcile_portfolio_counters(connection)
+
+def portfolio_counters(*names):
+    """Current values of the named counters (0 for counters with no row yet)"""
+    table = PortfolioCounter.__table__
+    rows = db.session.execute(db.select(table.c.name, table.c.value).where(table.c.name.in_(names)))
+    values = dict.fromkeys(names, 0)
+    values.update(rows.all())
+    return values
+
+# Pre-call profile read path
+def latest_loan_id_subquery():
+    """Correlated subquery selecting the id of a customer's most recent loan"""
+    return (
+        db.select(Loan.id)
+        .where(Loan.customer_id == Customer.id)
+        .order_by(Loan.created_at.desc(), Loan.id.desc())
+        .limit(1)
+        .correlate(Customer)
+        .scalar_subquery()
+    )
+
+def latest_interaction_id_subquery():
+    """Correlated subquery selecting the id of a customer's most recent interaction"""
+    return (
+        db.select(CustomerInteraction.id)
+        .where(CustomerInteraction.customer_id == Customer.id)
+        .order_by(CustomerInteraction.created_at.desc(), CustomerInteraction.id.desc())
+        .limit(1)
+        .correlate(Customer)
+        .scalar_subquery()
+    )
+
+def pre_call_profile_query():
+    """
+    Select everything fetch_user_profile_pre_call returns in one statement:
+    the customer row outer-joined to its latest loan and latest interaction.
+    Callers add the WHERE clause (phone number, customer ids, ...).
+    """
+    return (
+        db.select(
+            Customer.id.label('customer_id'),
+            Customer.account_number,
+            Customer.first_name,
+            Customer.last_name,
+            Customer.address_line_1,
+            Customer.address_line_2,
+            Customer.zip_code,
+            Customer.city,
+            Customer.state,
+            Customer.ssn,
+            Customer.dob,
+            Customer.primary_phone_number,
+            Customer.email_address,
+            Customer.customer_number,
+            Customer.record_type,
+            Customer.borrower_first_name,
+            Customer.borrower_last_name,
+            Customer.is_eligible_to_call,
+            Customer.transfer_phone_number,
+            Customer.transfer_ip_address,
+            Loan.product_name,
+            Loan.due_amount,
+            Loan.no_of_missed_installments,
+            Loan.contractual_installment_amount,
+            Loan.interest_late_fee,
+            Loan.minimum_amount,
+            Loan.acceptable_pay_later_date,
+            Loan.acceptable_already_paid_date,
+            Loan.grace_period_date,
+            Loan.due_date,
+            CustomerInteraction.creation_date.label('interaction_creation_date'),
+            CustomerInteraction.last_updated_date.label('interaction_last_updated_date'),
+            CustomerInteraction.source.label('interaction_source'),
+            CustomerInteraction.status.label('interaction_status'),
+            CustomerInteraction.notes.label('interaction_notes')
+        )
+        .outerjoin(Loan, Loan.id == latest_loan_id_subquery())
+        .outerjoin(CustomerInteraction, CustomerInteraction.id == latest_interaction_id_subquery())
+    )
+
+# Pre-call response sections, read from pre_call_profile_query() / caller card rows
+PRE_CALL_USER_INFO_FIELDS = {
+    **column_fields('account_number', 'first_name', 'last_name', 'product_name', 'address_line_1', 'address_line_2',
+                    'zip_code', 'city', 'state', 'ssn'),
+    **date_fields('dob'),
+    **column_fields('primary_phone_number', 'email_address', 'due_amount', 'no_of_missed_installments',
+                    'contractual_installment_amount', 'interest_late_fee', 'minimum_amount', 'customer_number'),
+    **date_fields('acceptable_pay_later_date', 'acceptable_already_paid_date', 'grace_period_date', 'due_date'),
+    **column_fields('record_type', 'borrower_first_name', 'borrower_last_name', 'is_eligible_to_call',
+                    'transfer_phone_number', 'transfer_ip_address')
+}
+
+PRE_CALL_METADATA_FIELDS = {
+    'creation_date': date_field('interaction_creation_date'),
+    'last_updated_date': date_field('interaction_last_updated_date'),
+    'source': column_field('interaction_source'),
+    'status': column_field('interaction_status'),
+    'notes': column_field('interaction_notes')
+}
+
+def build_caller_details(row):
+    """Build the caller_details entry of the pre-call response from a pre_call_profile_query() row"""
+    return {
+        "user_info": serialize(row, PRE_CALL_USER_INFO_FIELDS, PRE_CALL_USER_INFO_FIELDS),
+        "metadata": serialize(row, PRE_CALL_METADATA_FIELDS, PRE_CALL_METADATA_FIELDS)
+    }
+
+# Caller card maintenance
+def caller_card_select():
+    """
+    Select caller card rows: the pre-call profile for every indexed phone number,
+    keeping one customer per number (primary numbers first, then lowest customer id)
+    """
+    winner = db.aliased(CustomerPhoneNumber)
+    winning_phone_id = (
+        db.select(winner.id)
+        .where(winner.phone_number == CustomerPhoneNumber.phone_number)
+        .order_by(winner.source, winner.customer_id)
+        .limit(1)
+        .correlate(CustomerPhoneNumber)
+        .scalar_subquery()
+    )
+    return (
+        pre_call_profile_query()
+        .add_columns(
+            CustomerPhoneNumber.phone_number,
+            CustomerPhoneNumber.source.label('phone_source'),
+            db.literal(datetime.utcnow(), db.DateTime).label('updated_at')
+        )
+        .join(CustomerPhoneNumber, CustomerPhoneNumber.customer_id == Customer.id)
+        .where(CustomerPhoneNumber.id == winning_phone_id)
+    )
+
+def insert_caller_cards(select_stmt, session=None):
+    session = session if session is not None else db.session
+    columns = list(select_stmt.selected_columns.keys())
+    return session.execute(db.insert(CallerCard).from_select(columns, select_stmt)).rowcount
+
+def refresh_caller_cards(customer_ids, session=None, chunk_size=500):
+    """Rewrite the caller cards of every phone number held (now or before) by customer_ids"""
+    session = session if session is not None else db.session
+    customer_ids = list(customer_ids)
+    for start in range(0, len(customer_ids), chunk_size):
+        chunk = customer_ids[start:start + chunk_size]
+        phone_numbers = set(session.execute(
+            db.select(CustomerPhoneNumber.phone_number).where(CustomerPhoneNumber.customer_id.in_(chunk))
+        ).scalars())
+        phone_numbers.update(session.execute(
+            db.select(CallerCard.phone_number).where(CallerCard.customer_id.in_(chunk))
+        ).scalars())
+        if not phone_numbers:
+            continue
+        # A number's card can move to another customer; its cache entry is dropped on commit
+        session.info.setdefault('rewritten_phone_numbers', set()).update(phone_numbers)
+        session.execute(db.delete(CallerCard).where(CallerCard.phone_number.in_(phone_numbers)))
+        insert_caller_cards(
+            caller_card_select().where(CustomerPhoneNumber.phone_number.in_(phone_numbers)),
+            session
+        )
+
+def rebuild_caller_cards():
+    """Regenerate the whole caller_card table with one INSERT ... SELECT; returns rows written"""
+    db.session.execute(db.delete(CallerCard))
+    written = insert_caller_cards(caller_card_select())
+    db.session.commit()
+    caller_profile_cache.clear()
+    return written
+
+@event.listens_for(db.session, 'before_commit')
+def refresh_touched_caller_cards(session):
+    """Keep caller cards consistent with the customers written in this transaction"""
+    session.flush()
+    customer_ids = session.info.get('touched_customer_ids')
+    if customer_ids:
+        refresh_caller_cards(customer_ids, session)
+
+# Customer search index: an FTS5 table on SQLite, a table with a GIN-indexed
+# tsvector on PostgreSQL. Not a model: created alongside the tables (see
+# create_customer_search_index) and refreshed for touched customers on commit.
+CUSTOMER_SEARCH_COLUMNS = (
+    Customer.id, Customer.first_name, Customer.last_name, Customer.borrower_first_name,
+    Customer.borrower_last_name, Customer.email_address, Customer.account_number,
+    Customer.primary_phone_number, Customer.transfer_phone_number
+)
+
+def customer_search_table(dialect):
+    """The search table as a lightweight table clause (FTS5 keys rows by rowid)"""
+    key = 'rowid' if dialect.name == 'sqlite' else 'customer_id'
+    return db.table('customer_search', db.column(key, db.Integer), db.column('document', db.Text))
+
+def create_customer_search_table(conn):
+    """Create the search table if it is missing; returns True when it was created"""
+    if db.inspect(conn).has_table('customer_search'):
+        return False
+    if conn.dialect.name == 'sqlite':
+        conn.execute(db.text(
+            "CREATE VIRTUAL TABLE customer_search USING fts5(document, prefix='2 3 4')"
+        ))
+    else:
+        conn.execute(db.text(
+            "CREATE TABLE customer_search ("
+            "customer_id INTEGER PRIMARY KEY, "
+            "document TEXT NOT NULL, "
+            "search_vector tsvector GENERATED ALWAYS AS (to_tsvector('simple', document)) STORED)"
+        ))
+        conn.execute(db.text(
+            "CREATE INDEX ix_customer_search_vector ON customer_search USING gin (search_vector)"
+        ))
+    return True
+
+def customer_search_rows(rows, dialect):
+    """Search table rows for rows of CUSTOMER_SEARCH_COLUMNS"""
+    key = customer_search_table(dialect).c[0].name
+    country_code = app.config['PHONE_DEFAULT_COUNTRY_CODE']
+    return [{
+        key: row.id,
+        'document': search_document(
+            (row.first_name, row.last_name, row.borrower_first_name, row.borrower_last_name),
+            row.email_address,
+            row.account_number,
+            [row.primary_phone_number, row.transfer_phone_number] + [
+                phone_number for phone_number, source
+                in customer_phone_entries(row.primary_phone_number, row.transfer_phone_number, country_code)
+            ]
+        )
+    } for row in rows]
+
+def refresh_customer_search(customer_ids, session=None, chunk_size=500):
+    """Rewrite the search documents of customer_ids (deleted customers drop out)"""
+    session = session if session is not None else db.session
+    dialect = session.get_bind().dialect
+    table = customer_search_table(dialect)
+    key = table.c[0]
+    customer_ids = list(customer_ids)
+    for start in range(0, len(customer_ids), chunk_size):
+        chunk = customer_ids[start:start + chunk_size]
+        session.execute(db.delete(table).where(key.in_(chunk)))
+        rows = session.execute(db.select(*CUSTOMER_SEARCH_COLUMNS).where(Customer.id.in_(chunk))).all()
+        if rows:
+            session.execute(db.insert(table), customer_search_rows(rows, dialect))
+
+def rebuild_customer_search(conn, chunk_size=1000):
+    """Regenerate every search document, walking customers in id order; returns rows written"""
+    table = customer_search_table(conn.dialect)
+    conn.execute(db.delete(table))
+    written = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            db.select(*CUSTOMER_SEARCH_COLUMNS)
+            .where(Customer.id > last_id)
+            .order_by(Customer.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            return written
+        conn.execute(db.insert(table), customer_search_rows(rows, conn.dialect))
+        written += len(rows)
+        last_id = rows[-1].id
+
+@event.listens_for(db.metadata, 'after_create')
+def create_customer_search_index(target, connection, **kw):
+    """Create the search index with the tables, indexing existing customers the first time"""
+    if create_customer_search_table(connection):
+        written = rebuild_customer_search(connection)
+        print(f"🔎 Created customer search index ({written} customers)")
+
+@event.listens_for(db.metadata, 'before_drop')
+def drop_customer_search_index(target, connection, **kw):
+    connection.execute(db.text("DROP TABLE IF EXISTS customer_search"))
+
+@event.listens_for(db.session, 'before_commit')
+def refresh_touched_customer_search(session):
+    """Keep search documents consistent with the customers written in this transaction"""
+    session.flush()
+    customer_ids = session.info.get('touched_customer_ids')
+    if customer_ids:
+        refresh_customer_search(customer_ids, session)
+
+# Registered after the other before_commit hooks so their flushes are counted too
+@event.listens_for(db.session, 'before_commit')
+def apply_portfolio_counters(session):
+    """Write this transaction's counter deltas last, so the counter rows stay locked only briefly"""
+    session.flush()
+    deltas = session.info.pop('portfolio_counter_deltas', None)
+    if deltas:
+        apply_counter_deltas(session.connection(), deltas)
+
+def search_customer_ids(tokens, limit):
+    """Ids of the best limit customers matching every token as a prefix, best first"""
+    dialect = db.session.get_bind().dialect
+    if dialect.name == 'sqlite':
+        statement = db.text(
+            "SELECT rowid FROM customer_search WHERE customer_search MATCH :match "
+            "ORDER BY rank, rowid LIMIT :limit"
+        ).bindparams(match=fts5_match_query(tokens), limit=limit)
+    else:
+        statement = db.text(
+            "SELECT customer_id FROM customer_search, to_tsquery('simple', :match) AS query "
+            "WHERE search_vector @@ query "
+            "ORDER BY ts_rank(search_vector, query) DESC, customer_id LIMIT :limit"
+        ).bindparams(match=tsquery(tokens), limit=limit)
+    return list(db.session.execute(statement).scalars())
+
+def pre_call_success_response(row):
+    """The fetch_user_profile_pre_call success response (with ETag) for a caller card row"""
+    response = jsonify({
+        "success": "True",
+        "caller_details": [build_caller_details(row)],
+        "status": {
+            "type": "success",
+            "message": "Successful"
+        }
+    })
+    response.set_etag(caller_card_etag(row))
+    return response
+
+def cache_pre_call_response(phone_number, response, customer_id, version=None):
+    return caller_profile_cache.set(
+        phone_number,
+        (response.get_data(), response.get_etag()[0]),
+        customer_id,
+        version=version
+    )
+
+# Conditional GET support
+def make_etag(*parts):
+    """Strong ETag from the version columns (ids, updated_at, counts) behind a response"""
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+def not_modified(etag):
+    response = app.response_class(status=304)
+    response.set_etag(etag)
+    return response
+
+def caller_card_etag(row):
+    # Caller cards are rewritten (new updated_at) whenever the customer,
+    # their latest loan or latest interaction changes
+    return make_etag('caller_card', row.phone_number, row.customer_id, row.updated_at)
+
+def customer_etag(customer_id):
+    """Version lookup for customer_detail; None if the customer doesn't exist"""
+    # Counts catch deletes; max(updated_at) catches inserts and edits
+    row = db.session.execute(
+        db.select(
+            Customer.updated_at,
+            db.select(db.func.count(Loan.id)).where(Loan.customer_id == customer_id).scalar_subquery(),
+            db.select(db.func.max(Loan.updated_at)).where(Loan.customer_id == customer_id).scalar_subquery(),
+            db.select(db.func.count(CustomerInteraction.id))
+            .where(CustomerInteraction.customer_id == customer_id).scalar_subquery(),
+            db.select(db.func.max(CustomerInteraction.updated_at))
+            .where(CustomerInteraction.customer_id == customer_id).scalar_subquery()
+        ).where(Customer.id == customer_id)
+    ).first()
+    if row is None:
+        return None
+    return make_etag('customer', customer_id, *row)
+
+def loan_etag(loan_id):
+    """Version lookup for loan_detail; None if the loan doesn't exist"""
+    row = db.session.execute(
+        db.select(Loan.updated_at, Loan.customer_id, Loan.vehicle_id, Customer.updated_at)
+        .outerjoin(Customer, Customer.id == Loan.customer_id)
+        .where(Loan.id == loan_id)
+    ).first()
+    if row is None:
+        return None
+    return make_etag('loan', loan_id, *row)
+
+# Caller profile cache warm-up
+def warm_caller_profile_cache(days_before=None, days_after=None, today=None, chunk_size=1000):
+    """
+    Preload the caller profile cache for today's likely calls: customers that are
+    eligible to call and have a loan whose due_date or grace_period_date falls
+    within [today - days_before, today + days_after]. Returns (entries, seconds).
+    """
+    days_before = app.config['CALLER_CACHE_WARMUP_DAYS_BEFORE'] if days_before is None else days_before
+    days_after = app.config['CALLER_CACHE_WARMUP_DAYS_AFTER'] if days_after is None else days_after
+    today = today or date.today()
+    window_start = today - timedelta(days=days_before)
+    window_end = today + timedelta(days=days_after)
+    started = time.monotonic()
+    
+    customers_in_window = (
+        db.select(Loan.customer_id)
+        .where(db.or_(
+            Loan.due_date.between(window_start, window_end),
+            Loan.grace_period_date.between(window_start, window_end)
+        ))
+    )
+    cards = (
+        db.select(CallerCard.__table__)
+        .where(CallerCard.is_eligible_to_call.is_(True))
+        .where(CallerCard.customer_id.in_(customers_in_window))
+        .order_by(CallerCard.phone_number)
+        .limit(chunk_size)
+    )
+    
+    loaded = 0
+    last_phone_number = None
+    while loaded < caller_profile_cache.max_entries:
+        # Version read before each chunk's query: a commit during the warm-up
+        # only discards the fills of the chunk it overlaps
+        version = caller_profile_cache.version()
+        chunk = cards if last_phone_number is None else cards.where(CallerCard.phone_number > last_phone_number)
+        rows = db.session.execute(chunk).all()
+        if not rows:
+            break
+        for row in rows:
+            if loaded >= caller_profile_cache.max_entries:
+                break
+            if cache_pre_call_response(row.phone_number, pre_call_success_response(row), row.customer_id,
+                                       version=version):
+                loaded += 1
+        last_phone_number = rows[-1].phone_number
+    
+    return loaded, round(time.monotonic() - started, 3)
+
+def start_caller_cache_warmup(**kwargs):
+    """Warm the caller profile cache in a background thread so startup isn't blocked"""
+    def run():
+        with app.app_context():
+            try:
+                loaded, seconds = warm_caller_profile_cache(**kwargs)
+                print(f"🔥 Caller cache warm-up loaded {loaded} profiles in {seconds}s")
+            except Exception as e:
+                print(f"❌ Caller cache warm-up failed: {e}")
+    
+    thread = threading.Thread(target=run, name='caller-cache-warmup', daemon=True)
+    thread.start()
+    return thread
+
+# Post-call outcome processing
+def validate_call_outcome(data):
+    """Payload checks shared by the sync and queued paths; returns (error, status_code) or None"""
+    if not data:
+        return {
+            "success": "False",
+            "message": "No data provided",
+            "status": {
+                "type": "error",
+                "message": "Request body is required"
+            }
+        }, 400
+    
+    if not data.get('user_info', {}).get('account_number'):
+        return {
+            "success": "False",
+            "message": "account_number is required in user_info",
+            "status": {
+                "type": "error",
+                "message": "Missing required field: account_number"
+            }
+        }, 400
+    
+    return None
+
+LOAN_OUTCOME_FIELDS = ['product_name', 'due_amount', 'no_of_missed_installments', 
+                       'contractual_installment_amount', 'interest_late_fee', 'minimum_amount']
+LOAN_OUTCOME_DATE_FIELDS = ['acceptable_pay_later_date', 'acceptable_already_paid_date', 
+                            'grace_period_date', 'due_date']
+# Customer columns a payload may not overwrite
+CUSTOMER_OUTCOME_EXCLUDED_FIELDS = {'id', 'created_at', 'updated_at'}
+
+def customer_outcome_values(user_info):
+    """Customer column values requested by an outcome payload"""
+    values = {}
+    for field, value in user_info.items():
+        if field in Customer.__table__.c and field not in CUSTOMER_OUTCOME_EXCLUDED_FIELDS and value is not None:
+            # Handle date fields specially
+            if field == 'dob' and isinstance(value, str):
+                try:
+                    value = datetime.strptime(value, '%Y-%m-%d').date()
+                except ValueError:
+                    continue
+            values[field] = value
+    return values
+
+def loan_outcome_values(user_info, outcome_details):
+    """Loan column values requested by an outcome payload, before the disposition rules"""
+    values = {}
+    
+    # Loan fields from user_info
+    for field in LOAN_OUTCOME_FIELDS:
+        if field in user_info and user_info[field] is not None:
+            values[field] = user_info[field]
+    
+    # Date fields
+    for field in LOAN_OUTCOME_DATE_FIELDS:
+        if field in user_info and user_info[field]:
+            try:
+                values[field] = datetime.strptime(user_info[field], '%Y-%m-%d').date()
+            except ValueError:
+                continue
+    
+    # Outcome-specific updates: the agreed amount becomes the due amount
+    if outcome_details.get('user_agreed_payment_amount'):
+        try:
+            values['due_amount'] = float(outcome_details['user_agreed_payment_amount'])
+        except ValueError:
+            pass
+    
+    if outcome_details.get('pay_later_date'):
+        try:
+            values['acceptable_pay_later_date'] = datetime.strptime(outcome_details['pay_later_date'], '%Y-%m-%d').date()
+        except ValueError:
+            pass
+    
+    return values
+
+def disposition_loan_status(outcome_details):
+    """Loan status implied by the final disposition, or None"""
+    final_disposition = outcome_details.get('final_disposition', '').lower()
+    if final_disposition in ['resolved', 'paid', 'current']:
+        return 'current'
+    if final_disposition in ['promise_to_pay', 'callback_scheduled']:
+        return 'arranged'
+    return None
+
+def apply_customer_outcome(customer, user_info):
+    """Copy changed user_info fields onto a loaded customer; returns True if anything changed"""
+    customer_updated = False
+    for field, value in customer_outcome_values(user_info).items():
+        if getattr(customer, field) != value:
+            setattr(customer, field, value)
+            customer_updated = True
+    
+    if customer_updated:
+        customer.updated_at = datetime.utcnow()
+    
+    return customer_updated
+
+def apply_loan_outcome(loan, user_info, outcome_details):
+    """Apply an outcome to a loaded loan; returns True if anything changed"""
+    loan_updated = False
+    for field, value in loan_outcome_values(user_info, outcome_details).items():
+        if getattr(loan, field) != value:
+            setattr(loan, field, value)
+            loan_updated = True
+    
+    # Update loan status based on disposition
+    status = disposition_loan_status(outcome_details)
+    if status and loan.status != status:
+        loan.status = status
+        if status == 'current':
+            loan.no_of_missed_installments = 0
+            loan.due_amount = 0.0
+        loan_updated = True
+    
+    if loan_updated:
+        loan.updated_at = datetime.utcnow()
+    
+    return loan_updated
+
+def values_differ(table, values):
+    """WHERE clause that is true when any column differs from its new value"""
+    return db.or_(*(table.c[field].is_distinct_from(value) for field, value in values.items()))
+
+def execute_guarded_update(statement, table):
+    """Run an UPDATE guarded by values_differ(); True if it wrote a row"""
+    if db.session.get_bind().dialect.update_returning:
+        return db.session.execute(statement.returning(table.c.id)).first() is not None
+    return db.session.execute(statement).rowcount > 0
+
+def update_customer_outcome(customer_id, user_info):
+    """
+    Set-based apply_customer_outcome(): one UPDATE of the requested columns
+    that only writes the row when a value actually differs.
+    """
+    values = customer_outcome_values(user_info)
+    if not values:
+        return False
+    
+    table = Customer.__table__
+    customer_updated = execute_guarded_update(
+        db.update(table)
+        .where(table.c.id == customer_id, values_differ(table, values))
+        .values(**values, updated_at=datetime.utcnow()),
+        table
+    )
+    
+    if customer_updated:
+        # Core update: not seen by the flush hooks
+        mark_customer_touched(customer_id)
+        if 'primary_phone_number' in values or 'transfer_phone_number' in values:
+            customer = db.session.get(Customer, customer_id, populate_existing=True)
+            sync_customer_phone_numbers(customer)
+    return customer_updated
+
+def update_loan_outcome(customer_id, user_info, outcome_details):
+    """
+    Set-based apply_loan_outcome() for the customer's latest loan: a single
+    UPDATE (latest loan picked by subquery, disposition rules as CASE
+    expressions on the current status) that only writes when a value differs.
+    """
+    table = Loan.__table__
+    values = loan_outcome_values(user_info, outcome_details)
+    
+    status = disposition_loan_status(outcome_details)
+    if status == 'current':
+        # A loan that becomes current has nothing due or missed
+        becomes_current = table.c.status.is_distinct_from('current')
+        values['due_amount'] = db.case(
+            (becomes_current, 0.0), else_=values.get('due_amount', table.c.due_amount)
+        )
+        values['no_of_missed_installments'] = db.case(
+            (becomes_current, 0), else_=values.get('no_of_missed_installments', table.c.no_of_missed_installments)
+        )
+    if status:
+        values['status'] = status
+    if not values:
+        return False
+    
+    latest = table.alias('latest_loan')
+    latest_loan_id = (
+        db.select(latest.c.id)
+        .where(latest.c.customer_id == customer_id)
+        .order_by(latest.c.created_at.desc(), latest.c.id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    # Status is counted in portfolio_counter (the other counted columns are never set here);
+    # the row is locked so the status it replaces can't change before the UPDATE
+    old_status = None
+    if status:
+        old_status = db.session.execute(
+            db.select(table.c.status).where(table.c.id == latest_loan_id).with_for_update()
+        ).scalar()
+    loan_updated = execute_guarded_update(
+        db.update(table)
+        .where(table.c.id == latest_loan_id, values_differ(table, values))
+        .values(**values, updated_at=datetime.utcnow()),
+        table
+    )
+    
+    if loan_updated:
+        mark_customer_touched(customer_id)
+        if status and status != old_status:
+            add_counter_deltas(db.session, {loan_status_counter(old_status): -1, loan_status_counter(status): 1})
+    return loan_updated
+
+def call_outcome_interaction_data(customer_id, data):
+    """Column values of the CustomerInteraction logged for an outcome payload"""
+    outcome_details = data.get('outcome_details', {})
+    metadata = data.get('metadata', {})
+    call_outcome_note = data.get('call_outcome_note', '')
+    
+    # Create comprehensive interaction record
+    interaction_data = {
+        'customer_id': customer_id,
+        'creation_date': datetime.utcnow(),
+        'last_updated_date': datetime.utcnow().date(),
+        'source': outcome_details.get('contact_type', 'Phone Call'),
+        'status': outcome_details.get('final_disposition', 'Completed'),
+        'notes': '',
+        'call_identifier': call_outcome_identifier(data)
+    }
+    
+    # Parse creation date if provided in metadata
+    if metadata.get('creation_date'):
+        try:
+            interaction_data['creation_date'] = datetime.strptime(
+                metadata['creation_date'], '%Y-%m-%d %H:%M:%S.%f%z'
+            )
+        except ValueError:
+            try:
+                interaction_data['creation_date'] = datetime.strptime(
+                    metadata['creation_date'], '%Y-%m-%d %H:%M:%S.%f-%H:%M'
+                )
+            except ValueError:
+                pass
+    
+    # Human-readable summary shown in the agent UI (structured copy in CallOutcome)
+    interaction_data['notes'] = format_call_outcome_notes(outcome_details, call_outcome_note, metadata.get('notes'))
+    return interaction_data
+
+def call_outcome_fields(data, interaction_data):
+    """Column values of the structured CallOutcome row for an outcome payload"""
+    outcome_details = data.get('outcome_details', {})
+    dialing = outcome_details.get('dialing_status') or {}
+    trace = outcome_details.get('disposition_trace')
+    
+    def text(value):
+        return str(value) if value is not None and value != '' else None
+    
+    return {
+        'customer_id': interaction_data['customer_id'],
+        'call_date': interaction_data['creation_date'],
+        'disposition': interaction_data['status'],
+        'call_type': text(outcome_details.get('call_type')),
+        'call_duration': text(outcome_details.get('call_duration')),
+        'disposition_trace': [str(step) for step in trace] if trace else None,
+        'agreed_payment_amount': parse_amount(outcome_details.get('user_agreed_payment_amount')),
+        'pay_later_date': parse_date(outcome_details.get('pay_later_date')),
+        'call_end_status': text(outcome_details.get('call_end_status')),
+        'dialing_long_code': text(dialing.get('long_code')),
+        'dialing_short_code': text(dialing.get('short_code')),
+        'dialing_details': text(dialing.get('details')),
+        'outcome_note': text(data.get('call_outcome_note')),
+        'additional_notes': text((data.get('metadata') or {}).get('notes'))
+    }
+
+def call_outcome_identifier(data):
+    """The vendor's call id for an outcome payload (idempotency key), or None"""
+    call_identifier = (data.get('outcome_details') or {}).get('call_identifier')
+    if call_identifier is None or call_identifier == '':
+        return None
+    return str(call_identifier)
+
+def find_call_outcome_replays(call_identifiers):
+    """
+    Original responses for call ids that were already processed, keyed by
+    call id. One probe of the unique call_identifier index.
+    """
+    call_identifiers = [c for c in call_identifiers if c is not None]
+    if not call_identifiers:
+        return {}
+    rows = db.session.execute(
+        db.select(
+            CustomerInteraction.call_identifier,
+            CustomerInteraction.id,
+            CustomerInteraction.customer_updated,
+            CustomerInteraction.loan_updated
+        ).where(CustomerInteraction.call_identifier.in_(call_identifiers))
+    )
+    return {
+        row.call_identifier: call_outcome_success(bool(row.customer_updated), bool(row.loan_updated), row.id)
+        for row in rows
+    }
+
+def call_outcome_not_found(account_number):
+    return {
+        "success": "False",
+        "message": f"Customer not found with account number: {account_number}",
+        "status": {
+            "type": "error",
+            "message": "Customer not found"
+        }
+    }, 404
+
+def call_outcome_success(customer_updated, loan_updated, interaction_id):
+    return {
+        "success": "True",
+        "message": "Call outcome processed successfully",
+        "updates": {
+            "customer_updated": customer_updated,
+            "loan_updated": loan_updated,
+            "interaction_created": True,
+            "interaction_id": interaction_id
+        },
+        "status": {
+            "type": "success",
+            "message": "Call outcome recorded and updates applied"
+        }
+    }, 200
+
+def process_call_outcome(data):
+    """
+    Apply one post-call outcome payload: update the customer and their latest
+    loan and log a CustomerInteraction. Changes are flushed, not committed.
+    Returns (response, status_code).
+    """
+    error = validate_call_outcome(data)
+    if error:
+        return error
+    
+    # Vendor retries: answer with the original result instead of applying it twice
+    call_identifier = call_outcome_identifier(data)
+    replay = find_call_outcome_replays([call_identifier]).get(call_identifier)
+    if replay:
+        return replay
+    
+    user_info = data.get('user_info', {})
+    outcome_details = data.get('outcome_details', {})
+    account_number = user_info.get('account_number')
+    
+    # Find customer by account number
+    customer_id = db.session.execute(
+        db.select(Customer.id).where(Customer.account_number == account_number).limit(1)
+    ).scalar()
+    if customer_id is None:
+        return call_outcome_not_found(account_number)
+    
+    # Targeted UPDATEs instead of loading and comparing the ORM objects
+    customer_updated = update_customer_outcome(customer_id, user_info)
+    loan_updated = update_loan_outcome(customer_id, user_info, outcome_details)
+    
+    # Create the interaction record (flushed so its id is known; the caller commits)
+    interaction_data = call_outcome_interaction_data(customer_id, data)
+    interaction = CustomerInteraction(
+        **interaction_data,
+        customer_updated=customer_updated,
+        loan_updated=loan_updated
+    )
+    interaction.call_outcome = CallOutcome(**call_outcome_fields(data, interaction_data))
+    db.session.add(interaction)
+    db.session.flush()
+    
+    return call_outcome_success(customer_updated, loan_updated, interaction.id)
+
+def process_call_outcome_chunk(payloads):
+    """
+    Apply a list of outcome payloads with set-based lookups: one query for
+    the customers, one for their latest loans and one bulk interaction insert.
+    Changes are not committed. Returns one (response, status_code) per payload.
+    """
+    results = [None] * len(payloads)
+    
+    valid = []
+    for i, data in enumerate(payloads):
+        error = validate_call_outcome(data if isinstance(data, dict) else None)
+        if error:
+            results[i] = error
+        else:
+            valid.append(i)
+    if not valid:
+        return results
+    
+    # Replays of earlier requests, and repeats of a call id within this chunk
+    call_identifiers = {i: call_outcome_identifier(payloads[i]) for i in valid}
+    replays = find_call_outcome_replays(set(call_identifiers.values()))
+    first_index = {}
+    repeats = []  # (index, index of the first payload with the same call id)
+    remaining = []
+    for i in valid:
+        call_identifier = call_identifiers[i]
+        if call_identifier in replays:
+            results[i] = replays[call_identifier]
+        elif call_identifier is not None and call_identifier in first_index:
+            repeats.append((i, first_index[call_identifier]))
+        else:
+            if call_identifier is not None:
+                first_index[call_identifier] = i
+            remaining.append(i)
+    valid = remaining
+    
+    account_numbers = {str(payloads[i]['user_info']['account_number']) for i in valid}
+    customers = {}
+    for customer in Customer.query.filter(Customer.account_number.in_(account_numbers)).order_by(Customer.id):
+        customers.setdefault(customer.account_number, customer)
+    
+    latest_loan_ids = db.select(latest_loan_id_subquery()).where(
+        Customer.id.in_([customer.id for customer in customers.values()])
+    )
+    loans = {loan.customer_id: loan for loan in Loan.query.filter(Loan.id.in_(latest_loan_ids))}
+    
+    # Apply the updates in payload order so repeated accounts behave as sequential calls
+    pending = []  # (index, customer_updated, loan_updated)
+    interaction_rows = []
+    outcome_rows = []
+    for i in valid:
+        data = payloads[i]
+        user_info = data.get('user_info', {})
+        outcome_details = data.get('outcome_details', {})
+        customer = customers.get(str(user_info['account_number']))
+        if not customer:
+            results[i] = call_outcome_not_found(user_info['account_number'])
+            continue
+        
+        customer_updated = apply_customer_outcome(customer, user_info)
+        loan = loans.get(customer.id)
+        loan_updated = apply_loan_outcome(loan, user_info, outcome_details) if loan else False
+        pending.append((i, customer_updated, loan_updated))
+        interaction_data = call_outcome_interaction_data(customer.id, data)
+        interaction_rows.append({**interaction_data, 'customer_updated': customer_updated, 'loan_updated': loan_updated})
+        outcome_rows.append(call_outcome_fields(data, interaction_data))
+    
+    if interaction_rows:
+        interaction_ids = db.session.execute(
+            db.insert(CustomerInteraction).returning(CustomerInteraction.id, sort_by_parameter_order=True),
+            interaction_rows
+        ).scalars().all()
+        db.session.execute(db.insert(CallOutcome), [
+            {**row, 'interaction_id': interaction_id} for row, interaction_id in zip(outcome_rows, interaction_ids)
+        ])
+        # Core insert: not seen by the flush hooks
+        for row in interaction_rows:
+            mark_customer_touched(row['customer_id'])
+        add_counter_deltas(db.session, {'interactions': len(interaction_rows)})
+        for (i, customer_updated, loan_updated), interaction_id in zip(pending, interaction_ids):
+            results[i] = call_outcome_success(customer_updated, loan_updated, interaction_id)
+    
+    for i, first in repeats:
+        results[i] = results[first]
+    
+    return results
+
+def process_call_outcomes_bulk(payloads, chunk_size):
+    """
+    Apply outcome payloads chunk by chunk, committing after each chunk.
+    A chunk that fails is rolled back and its applied items reported as 500;
+    earlier chunks stay committed. Returns one (response, status_code) per payload.
+    """
+    results = []
+    for start in range(0, len(payloads), chunk_size):
+        chunk = payloads[start:start + chunk_size]
+        try:
+            chunk_results = process_call_outcome_chunk(chunk)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Bulk call outcome chunk at {start} failed: {e}")
+            error = call_outcome_error(e)
+            chunk_results = [
+                validate_call_outcome(data if isinstance(data, dict) else None) or (error, 500)
+                for data in chunk
+            ]
+        results.extend(chunk_results)
+    return results
+
+def call_outcome_error(e):
+    return {
+        "success": "False",
+        "message": f"Internal server error: {str(e)}",
+        "status": {
+            "type": "error",
+            "message": "Failed to process call outcome"
+        }
+    }
+
+def backfill_call_outcomes(chunk_size=1000):
+    """
+    One-time job: parse the notes of interactions logged before CallOutcome
+    existed and write their structured rows. Streams the interactions in id
+    order, committing each chunk, so it can be stopped and re-run safely.
+    Returns (interactions scanned, outcome rows written).
+    """
+    scanned = written = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            db.select(
+                CustomerInteraction.id,
+                CustomerInteraction.customer_id,
+                CustomerInteraction.creation_date,
+                CustomerInteraction.status,
+                CustomerInteraction.notes
+            )
+            .outerjoin(CallOutcome, CallOutcome.interaction_id == CustomerInteraction.id)
+            .where(CallOutcome.id.is_(None), CustomerInteraction.id > last_id)
+            .order_by(CustomerInteraction.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        
+        outcome_rows = []
+        for row in rows:
+            fields = parse_call_outcome_notes(row.notes)
+            if not fields:
+                # Not a post-call outcome (or one without any details)
+                continue
+            trace = fields.get('disposition_trace')
+            outcome_rows.append({
+                'interaction_id': row.id,
+                'customer_id': row.customer_id,
+                'call_date': row.creation_date,
+                'disposition': row.status,
+                'call_type': fields.get('call_type'),
+                'call_duration': fields.get('call_duration'),
+                'disposition_trace': trace.split(TRACE_SEPARATOR) if trace else None,
+                'agreed_payment_amount': parse_amount(fields.get('agreed_payment_amount')),
+                'pay_later_date': parse_date(fields.get('pay_later_date')),
+                'call_end_status': fields.get('call_end_status'),
+                'dialing_long_code': fields.get('dialing_long_code'),
+                'dialing_short_code': fields.get('dialing_short_code'),
+                'dialing_details': fields.get('dialing_details'),
+                'outcome_note': fields.get('outcome_note'),
+                'additional_notes': fields.get('additional_notes')
+            })
+        if outcome_rows:
+            db.session.execute(db.insert(CallOutcome), outcome_rows)
+        db.session.commit()
+        
+        scanned += len(rows)
+        written += len(outcome_rows)
+        last_id = rows[-1].id
+    return scanned, written
+
+def apply_queued_call_outcomes(items):
+    """Outcome queue worker callback: apply a batch of queued payloads in one transaction"""
+    with app.app_context():
+        try:
+            results = [process_call_outcome(item.payload) for item in items]
+            db.session.commit()
+            return results
+        except Exception:
+            db.session.rollback()
+            raise
+
+# Durable local queue for ?mode=async post-call outcomes (journal and threads start on first use)
+call_outcome_queue = OutcomeQueue(app.config['POST_CALL_QUEUE_PATH'])
+call_outcome_worker = OutcomeQueueWorker(
+    call_outcome_queue,
+    apply_queued_call_outcomes,
+    threads=app.config['POST_CALL_QUEUE_WORKERS'],
+    batch_size=app.config['POST_CALL_QUEUE_BATCH_SIZE']
+)
+
+# Response field maps with sparse fieldsets (?fields=a,b,c); see serializers.py
+def requested_fields(fields):
+    """
+    Field names asked for with ?fields= (all of them when absent).
+    Raises ValueError for unknown names.
+    """
+    raw = request.args.get('fields')
+    if not raw:
+        return list(fields)
+    names = list(dict.fromkeys(name.strip() for name in raw.split(',') if name.strip()))
+    unknown = [name for name in names if name not in fields]
+    if unknown or not names:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(fields)}")
+    return names
+
+def field_load_options(model, fields, names, extra_columns=()):
+    """Load only the columns behind names (plus the primary key), and the relations they need"""
+    columns = dict.fromkeys(['id', *extra_columns, *(column for name in names for column in fields[name].columns)])
+    options = [load_only(*(getattr(model, column) for column in columns))]
+    for name in names:
+        options.extend(fields[name].load_options())
+    return options
+
+def list_select(model, fields, names, extra_columns=()):
+    """
+    Core SELECT of the columns behind names (plus the primary key) and of
+    the to-one relations they read (outer joined), with the RowShape that
+    turns its result tuples into read-only row objects. Run it with
+    read_rows(); no ORM instances are built.
+    """
+    table = model.__table__
+    columns = list(dict.fromkeys(['id', *extra_columns, *(column for name in names for column in fields[name].columns)]))
+    selected = [table.c[column] for column in columns]
+    joined = table
+    relations = []
+    for name in names:
+        related = fields[name].related
+        if related is None:
+            continue
+        relationship_name, related_columns = related
+        relationship = db.inspect(model).relationships[relationship_name]
+        target = relationship.mapper.class_
+        related_columns = list(dict.fromkeys(['id', *related_columns]))
+        joined = joined.outerjoin(target.__table__, relationship.primaryjoin)
+        selected.extend(target.__table__.c[column] for column in related_columns)
+        relations.append((relationship_name, f'{target.__name__}Row', related_columns))
+    statement = db.select(*selected).select_from(joined)
+    return statement, RowShape(f'{model.__name__}Row', columns, relations)
+
+def read_rows(statement, shape):
+    """Execute a list_select() statement on the session's connection and return its row objects"""
+    return shape.rows(db.session.connection().execute(statement))
+
+CUSTOMER_SUMMARY_FIELDS = {
+    **column_fields('id', 'account_number', 'first_name', 'last_name', 'email_address', 'primary_phone_number',
+                    'customer_number', 'record_type', 'is_eligible_to_call'),
+    **date_fields('created_at')
+}
+
+CUSTOMER_LOAN_FIELDS = {
+    **column_fields('id', 'product_name', 'due_amount', 'no_of_missed_installments',
+                    'contractual_installment_amount', 'interest_late_fee', 'minimum_amount'),
+    **date_fields('due_date'),
+    **column_fields('status')
+}
+
+CUSTOMER_INTERACTION_FIELDS = {
+    **column_fields('id'),
+    **date_fields('creation_date', 'last_updated_date'),
+    **column_fields('source', 'status', 'notes')
+}
+
+def nested_collection(relationship, model, fields):
+    """Field holding a collection serialized with fields, loaded with one SELECT ... IN query"""
+    return SerializedField(
+        lambda obj: serialize_many(getattr(obj, relationship.key), fields, fields),
+        load_options=lambda: (selectinload(relationship).load_only(*(getattr(model, name) for name in fields)),)
+    )
+
+def recent_interactions(customer):
+    """
+    (most recent interactions, total count, cursor for the rest) of customer,
+    queried once per customer: CUSTOMER_DETAIL_INTERACTIONS_LIMIT rows newest
+    first, counted with a window function in the same statement. The cursor
+    continues GET /api/customers/<id>/interactions in its default order.
+    """
+    recent = getattr(customer, '_recent_interactions', None)
+    if recent is not None:
+        return recent
+    
+    limit = max(0, app.config['CUSTOMER_DETAIL_INTERACTIONS_LIMIT'])
+    rows = db.session.execute(
+        db.select(CustomerInteraction, db.func.count().over().label('total'))
+        .options(load_only(*(getattr(CustomerInteraction, name) for name in CUSTOMER_INTERACTION_FIELDS)))
+        .where(CustomerInteraction.customer_id == customer.id)
+        .order_by(CustomerInteraction.creation_date.desc(), CustomerInteraction.id.desc())
+        .limit(limit + 1)
+    ).all()
+    interactions = [interaction for interaction, total in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit and interactions:
+        last = interactions[-1]
+        next_cursor = encode_cursor(INTERACTION_PAGE_DEFAULT_ORDER, [last.creation_date, last.id])
+    recent = (interactions, rows[0].total if rows else 0, next_cursor)
+    customer._recent_interactions = recent
+    return recent
+
+CUSTOMER_DETAIL_FIELDS = {
+    **column_fields('id', 'account_number', 'first_name', 'last_name', 'email_address', 'primary_phone_number',
+                    'ssn'),
+    **date_fields('dob'),
+    **column_fields('address_line_1', 'address_line_2', 'city', 'state', 'zip_code', 'customer_number',
+                    'record_type', 'borrower_first_name', 'borrower_last_name', 'is_eligible_to_call',
+                    'transfer_phone_number', 'transfer_ip_address', 'credit_score', 'monthly_income',
+                    'employment_status'),
+    **date_fields('created_at'),
+    'loans': nested_collection(Customer.loans, Loan, CUSTOMER_LOAN_FIELDS),
+    'interactions': SerializedField(
+        lambda customer: serialize_many(
+            recent_interactions(customer)[0], CUSTOMER_INTERACTION_FIELDS, CUSTOMER_INTERACTION_FIELDS
+        )
+    ),
+    'interactions_total': SerializedField(lambda customer: recent_interactions(customer)[1]),
+    'interactions_next_cursor': SerializedField(lambda customer: recent_interactions(customer)[2])
+}
+
+LOAN_CUSTOMER_FIELD = SerializedField(
+    lambda loan: f"{loan.customer.first_name} {loan.customer.last_name}",
+    ('customer_id',),
+    lambda: (joinedload(Loan.customer).load_only(Customer.first_name, Customer.last_name),),
+    related=('customer', ('first_name', 'last_name'))
+)
+
+LOAN_VEHICLE_FIELD = SerializedField(
+    lambda loan: f"{loan.vehicle.year} {loan.vehicle.make} {loan.vehicle.model}" if loan.vehicle else None,
+    ('vehicle_id',),
+    lambda: (joinedload(Loan.vehicle).load_only(Vehicle.year, Vehicle.make, Vehicle.model),),
+    related=('vehicle', ('year', 'make', 'model'))
+)
+
+LOAN_SUMMARY_FIELDS = {
+    **column_fields('id'),
+    'customer': LOAN_CUSTOMER_FIELD,
+    **column_fields('customer_id'),
+    'vehicle': LOAN_VEHICLE_FIELD,
+    **column_fields('product_name', 'due_amount', 'no_of_missed_installments', 'contractual_installment_amount',
+                    'interest_late_fee', 'minimum_amount'),
+    **date_fields('due_date', 'acceptable_pay_later_date', 'acceptable_already_paid_date', 'grace_period_date'),
+    **column_fields('status')
+}
+
+LOAN_DETAIL_FIELDS = {
+    **column_fields('id', 'customer_id'),
+    'customer': LOAN_CUSTOMER_FIELD,
+    **column_fields('vehicle_id'),
+    'vehicle': LOAN_VEHICLE_FIELD,
+    **column_fields('product_name', 'due_amount', 'no_of_missed_installments', 'contractual_installment_amount',
+                    'interest_late_fee', 'minimum_amount'),
+    **date_fields('acceptable_pay_later_date', 'acceptable_already_paid_date', 'grace_period_date', 'due_date'),
+    **column_fields('loan_amount', 'interest_rate', 'term_months', 'monthly_payment', 'balance_remaining', 'status'),
+    **date_fields('next_payment_date', 'origination_date'),
+    **column_fields('days_past_due'),
+    **date_fields('created_at')
+}
+
+INTERACTION_FIELDS = {
+    **column_fields('id', 'customer_id'),
+    **date_fields('creation_date', 'last_updated_date'),
+    **column_fields('source', 'status', 'notes'),
+    **date_fields('created_at')
+}
+
+INTERACTION_DETAIL_FIELDS = {
+    **INTERACTION_FIELDS,
+    **date_fields('updated_at')
+}
+
+VEHICLE_FIELDS = model_fields(Vehicle)
+
+PAYMENT_FIELDS = model_fields(Payment)
+
+def fields_etag(etag, fields, names):
+    """ETag of a sparse representation: the full-resource ETag when every field is returned"""
+    return etag if names == list(fields) else make_etag(etag, names)
+
+# Streaming exports (nightly reconciliation)
+EXPORT_MODELS = {
+    'customers': Customer,
+    'loans': Loan,
+    'interactions': CustomerInteraction
+}
+# Columns never included in bulk exports (sensitive data, post-call idempotency bookkeeping)
+EXPORT_EXCLUDED_COLUMNS = {
+    'customers': {'ssn'},
+    'interactions': {'call_identifier', 'customer_updated', 'loan_updated'}
+}
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+# Every exported column, compiled from the table definitions
+EXPORT_FIELDS = {
+    entity: model_fields(model, EXPORT_EXCLUDED_COLUMNS.get(entity, ()))
+    for entity, model in EXPORT_MODELS.items()
+}
+
+def export_columns(entity):
+    excluded = EXPORT_EXCLUDED_COLUMNS.get(entity, set())
+    return [column for column in EXPORT_MODELS[entity].__table__.columns if column.name not in excluded]
+
+def export_value(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+def iter_export(entity, export_format, updated_since=None, updated_before=None, chunk_size=None):
+    """
+    Yield an export of entity as NDJSON or CSV text, one chunk of rows at a
+    time. Rows are read in id order through a server-side cursor
+    (yield_per), so memory stays flat whatever the table size. The optional
+    updated_at bounds (since inclusive, before exclusive) allow incremental pulls.
+    """
+    model = EXPORT_MODELS[entity]
+    columns = export_columns(entity)
+    names = [column.name for column in columns]
+    chunk_size = chunk_size or app.config['EXPORT_CHUNK_SIZE']
+    
+    statement = db.select(*columns).order_by(model.id)
+    if updated_since is not None:
+        statement = statement.where(model.updated_at >= updated_since)
+    if updated_before is not None:
+        statement = statement.where(model.updated_at < updated_before)
+    
+    if export_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(names)
+        yield buffer.getvalue()
+    
+    to_dict = serializer_for(EXPORT_FIELDS[entity], names)
+    shape = RowShape(f'{model.__name__}Row', names)
+    result = db.session.execute(statement, execution_options={'yield_per': chunk_size})
+    for rows in result.partitions():
+        if export_format == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerows([export_value(value) for value in row] for row in rows)
+            yield buffer.getvalue()
+        else:
+            yield ''.join(dumps_compact(to_dict(row)) + '\n' for row in shape.rows(rows))
+
+def parse_export_datetime(value, name):
+    """datetime from an ISO 8601 string (None passes through); ValueError names the parameter"""
+    if value is None or value == '':
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO 8601 date or datetime")
+
+# Keyset pagination for list endpoints
+PAGE_ORDERS = ('id', 'created_at')
+
+def wants_legacy_list():
+    """True when the client opted in to the old unpaginated list (?all=true)"""
+    return request.args.get('all', '').lower() in ('1', 'true', 'yes')
+
+def nulls_last(keys):
+    """True when the sort column of keys can be NULL; NULLs then sort last in both directions"""
+    return len(keys) > 1 and keys[0].expression.nullable
+
+def keyset_after(keys, values, descending=False):
+    """
+    WHERE clause for rows sorting strictly after values: (k1 > v1) OR (k1 = v1 AND k2 > v2) ...
+    With a nullable sort column the NULL rows come after every value, and a
+    cursor on a NULL row continues through the NULL rows in id order.
+    """
+    if nulls_last(keys) and values[0] is None:
+        return db.and_(keys[0].is_(None), keyset_after(keys[1:], values[1:], descending))
+    clauses = []
+    for i, key in enumerate(keys):
+        equal_prefix = [keys[j] == values[j] for j in range(i)]
+        clauses.append(db.and_(*equal_prefix, key < values[i] if descending else key > values[i]))
+    if nulls_last(keys):
+        clauses.append(keys[0].is_(None))
+    return db.or_(*clauses)
+
+def cursor_value(column, value):
+    """Convert a cursor value back to the column's Python type"""
+    if value is None:
+        return None
+    if isinstance(column.type, db.DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, db.Date):
+        return date.fromisoformat(value)
+    return value
+
+def page_order(model, orders=PAGE_ORDERS, default='id'):
+    """
+    Parse ?order into (order, keys, descending). keys are the sort column
+    followed by the id tie-breaker; a '-' prefix sorts descending.
+    Raises ValueError for unknown orders.
+    """
+    order = request.args.get('order', default)
+    name = order[1:] if order.startswith('-') else order
+    if name not in orders:
+        raise ValueError(f"order must be one of: {', '.join(orders)} (prefix with '-' for descending)")
+    keys = [model.id] if name == 'id' else [getattr(model, name), model.id]
+    return order, keys, order.startswith('-')
+
+def page_sort_columns(page):
+    """Columns keyset_page() needs loaded to build the next cursor"""
+    order, keys, descending = page
+    return [key.key for key in keys[:-1]]
+
+def order_by_keys(query, page):
+    """Sort query by the page order's keys"""
+    order, keys, descending = page
+    columns = [key.desc() if descending else key for key in keys]
+    if nulls_last(keys):
+        columns[0] = columns[0].nulls_last()
+    return query.order_by(*columns)
+
+def keyset_page_query(query, page):
+    """
+    Apply ?after / ?limit to query for the order parsed by page_order().
+    Returns (query, limit); raises ValueError for bad parameters.
+    """
+    order, keys, descending = page
+    try:
+        limit = int(request.args.get('limit', app.config['API_PAGE_DEFAULT_LIMIT']))
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    limit = max(1, min(limit, app.config['API_PAGE_MAX_LIMIT']))
     
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    after = request.args.get('after')
+    if after:
+        values = decode_cursor(after, order, len(keys))
+        try:
+            values = [cursor_value(key, value) for key, value in zip(keys, values)]
+        except (TypeError, ValueError):
+            raise ValueError('Invalid cursor')
+        query = query.filter(keyset_after(keys, values, descending))
     
-    # Relationships
-    payments = db.relationship('Payment', backref='loan', lazy=True)
-    notes = db.relationship('LoanNote', backref='loan', lazy=True)
+    # One extra row tells us whether there is a next page
+    return order_by_keys(query, page).limit(limit + 1), limit
 
-class Payment(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    loan_id = db.Column(db.Integer, db.ForeignKey('loan.id'), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
-    payment_date = db.Column(db.Date, nullable=False)
-    payment_method = db.Column(db.String(20), nullable=False)  # cash, check, card, ach
-    reference_number = db.Column(db.String(50), nullable=True)
-    notes = db.Column(db.Text, nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+def keyset_page(query, page, fetch=None):
+    """
+    Fetch one page of query in the order parsed by page_order() with an
+    index range scan (no OFFSET). fetch runs the paged query (default
+    query.all(); list endpoints pass read_rows for their Core selects).
+    Returns (rows, next_cursor, limit); raises ValueError for bad parameters.
+    """
+    order, keys, descending = page
+    query, limit = keyset_page_query(query, page)
+    rows = fetch(query) if fetch else query.all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(order, [getattr(rows[-1], key.key) for key in keys])
+    return rows, next_cursor, limit
 
-class CustomerNote(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=False)
-    note = db.Column(db.Text, nullable=False)
-    created_by = db.Column(db.String(100), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+# Interaction list: newest first unless another order is asked for
+INTERACTION_PAGE_ORDERS = ('id', 'creation_date')
+INTERACTION_PAGE_DEFAULT_ORDER = '-creation_date'
 
-class LoanNote(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    loan_id = db.Column(db.Integer, db.ForeignKey('loan.id'), nullable=False)
-    note = db.Column(db.Text, nullable=False)
-    created_by = db.Column(db.String(100), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+# Loan list filters and sort orders
+LOAN_PAGE_ORDERS = ('id', 'created_at', 'due_date', 'due_amount', 'days_past_due',
+                    'no_of_missed_installments', 'grace_period_date')
 
-class CustomerInteraction(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=False)
-    creation_date = db.Column(db.DateTime, nullable=False)
-    last_updated_date = db.Column(db.Date, nullable=False)
-    source = db.Column(db.String(100), nullable=False)
-    status = db.Column(db.String(50), nullable=False)
-    notes = db.Column(db.Text, nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+# Query parameter -> (column, operator, value type); 'in' takes a comma-separated list
+LOAN_LIST_FILTERS = {
+    'status': (Loan.status, 'in', str),
+    'product': (Loan.product_name, 'in', str),
+    'min_days_past_due': (Loan.days_past_due, '>=', int),
+    'max_days_past_due': (Loan.days_past_due, '<=', int),
+    'min_missed_installments': (Loan.no_of_missed_installments, '>=', int),
+    'max_missed_installments': (Loan.no_of_missed_installments, '<=', int),
+    'due_date_from': (Loan.due_date, '>=', date),
+    'due_date_to': (Loan.due_date, '<=', date),
+    'grace_period_from': (Loan.grace_period_date, '>=', date),
+    'grace_period_to': (Loan.grace_period_date, '<=', date),
+}
+
+def loan_list_filters(args):
+    """WHERE clauses for the loan list filters present in args; raises ValueError for bad values"""
+    clauses = []
+    for name, (column, operator, value_type) in LOAN_LIST_FILTERS.items():
+        value = args.get(name, '').strip()
+        if not value:
+            continue
+        if operator == 'in':
+            clauses.append(column.in_([v.strip() for v in value.split(',') if v.strip()]))
+            continue
+        try:
+            value = date.fromisoformat(value) if value_type is date else int(value)
+        except ValueError:
+            raise ValueError(f"{name} must be {'a date (YYYY-MM-DD)' if value_type is date else 'an integer'}")
+        clauses.append(column >= value if operator == '>=' else column <= value)
+    return clauses
+
+# Common loan list queries and the index each should be served by
+LOAN_LIST_INDEX_CHECKS = [
+    ('status=past_due&due_date_from=2024-01-01&due_date_to=2024-01-07', 'ix_loan_status_due_date'),
+    ('min_missed_installments=2&due_date_from=2024-01-01&due_date_to=2024-01-07&order=-due_amount',
+     'ix_loan_due_date_id'),
+    ('order=due_date', 'ix_loan_due_date_id'),
+    ('order=-due_amount', 'ix_loan_due_amount_id'),
+    ('min_days_past_due=30&max_days_past_due=90&order=-days_past_due', 'ix_loan_days_past_due_id'),
+    ('min_missed_installments=3&order=-no_of_missed_installments', 'ix_loan_missed_installments_id'),
+    ('grace_period_from=2024-01-01&grace_period_to=2024-01-31&order=grace_period_date', 'ix_loan_grace_period_id'),
+    ('product=Auto Loan&status=active', 'ix_loan_product_status'),
+]
+
+def loan_list_statement(query_string):
+    """The SELECT GET /api/loans?<query_string> runs for one page"""
+    with app.test_request_context('/api/loans', query_string=query_string):
+        page = page_order(Loan, LOAN_PAGE_ORDERS)
+        statement, shape = list_select(Loan, LOAN_SUMMARY_FIELDS, list(LOAN_SUMMARY_FIELDS), page_sort_columns(page))
+        statement, limit = keyset_page_query(statement.where(*loan_list_filters(request.args)), page)
+        return statement
+
+def explain_statement(statement):
+    """The database's query plan for statement, one line per plan row"""
+    dialect = db.engine.dialect
+    sql = str(statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+    with db.engine.connect() as conn:
+        if dialect.name == 'sqlite':
+            return [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+        if dialect.name == 'postgresql':
+            # Ask whether an index can serve the query, not whether a small table is cheaper to scan
+            conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        return [row[0] for row in conn.exec_driver_sql(f"EXPLAIN {sql}")]
+
+def check_loan_list_indexes():
+    """Explain each LOAN_LIST_INDEX_CHECKS query. Returns [(query_string, index, uses_index, plan)]"""
+    results = []
+    for query_string, index in LOAN_LIST_INDEX_CHECKS:
+        plan = explain_statement(loan_list_statement(query_string))
+        uses_index = any(index in line for line in plan)
+        results.append((query_string, index, uses_index, plan))
+    return results
 
 # API Routes
 
 @app.route('/api/customers', methods=['GET', 'POST'])  # type: ignore
 def customers():
     if request.method == 'GET':
-        customers = Customer.query.all()
-        return jsonify([{
-            'id': c.id,
-            'account_number': c.account_number,
-            'first_name': c.first_name,
-            'last_name': c.last_name,
-            'email_address': c.email_address,
-            'primary_phone_number': c.primary_phone_number,
-            'customer_number': c.customer_number,
-            'record_type': c.record_type,
-            'is_eligible_to_call': c.is_eligible_to_call,
-            'created_at': c.created_at.isoformat() if c.created_at else None
-        } for c in customers])
+        next_cursor = None
+        try:
+            names = requested_fields(CUSTOMER_SUMMARY_FIELDS)
+            page = page_order(Customer)
+            statement, shape = list_select(Customer, CUSTOMER_SUMMARY_FIELDS, names, page_sort_columns(page))
+            if wants_legacy_list():
+                customers = read_rows(statement, shape)
+            else:
+                customers, next_cursor, limit = keyset_page(
+                    statement, page, lambda statement: read_rows(statement, shape)
+                )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        items = serialize_many(customers, CUSTOMER_SUMMARY_FIELDS, names)
+        if wants_legacy_list():
+            return jsonify(items)
+        return jsonify({'customers': items, 'next_cursor': next_cursor, 'limit': limit})
     
     elif request.method == 'POST':
         data = request.get_json()
@@ -212,56 +2265,58 @@ def customers():
         db.session.commit()
         return jsonify({'message': 'Customer created successfully', 'id': customer.id}), 201
 
+@app.route('/api/customers/search', methods=['GET'])  # type: ignore
+def customer_search():
+    tokens = query_tokens(request.args.get('q', ''))
+    if not any(len(token) >= 2 for token in tokens):
+        return jsonify({'error': 'q must contain at least 2 consecutive letters or digits'}), 400
+    
+    try:
+        names = requested_fields(CUSTOMER_SUMMARY_FIELDS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        limit = int(request.args.get('limit', app.config['CUSTOMER_SEARCH_DEFAULT_LIMIT']))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    limit = max(1, min(limit, app.config['CUSTOMER_SEARCH_MAX_LIMIT']))
+    
+    customer_ids = search_customer_ids(tokens, limit)
+    customers = {}
+    if customer_ids:
+        customers = {c.id: c for c in Customer.query.filter(Customer.id.in_(customer_ids)).options(
+            *field_load_options(Customer, CUSTOMER_SUMMARY_FIELDS, names)
+        )}
+    # Rank order; ids of customers deleted since the search index was read drop out
+    items = serialize_many((customers[i] for i in customer_ids if i in customers), CUSTOMER_SUMMARY_FIELDS, names)
+    return jsonify({'customers': items, 'limit': limit})
+
 @app.route('/api/customers/<int:customer_id>', methods=['GET', 'PUT', 'DELETE'])  # type: ignore
 def customer_detail(customer_id):
-    customer = Customer.query.get_or_404(customer_id)
+    if request.method == 'GET':
+        try:
+            names = requested_fields(CUSTOMER_DETAIL_FIELDS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Answer polling clients from the version lookup before loading anything
+        etag = customer_etag(customer_id)
+        if etag is None:
+            abort(404)
+        etag = fields_etag(etag, CUSTOMER_DETAIL_FIELDS, names)
+        if request.if_none_match.contains_weak(etag):
+            return not_modified(etag)
     
+    customer_query = Customer.query
     if request.method == 'GET':
-        return jsonify({
-            'id': customer.id,
-            'account_number': customer.account_number,
-            'first_name': customer.first_name,
-            'last_name': customer.last_name,
-            'email_address': customer.email_address,
-            'primary_phone_number': customer.primary_phone_number,
-            'ssn': customer.ssn,
-            'dob': customer.dob.isoformat() if customer.dob else None,
-            'address_line_1': customer.address_line_1,
-            'address_line_2': customer.address_line_2,
-            'city': customer.city,
-            'state': customer.state,
-            'zip_code': customer.zip_code,
-            'customer_number': customer.customer_number,
-            'record_type': customer.record_type,
-            'borrower_first_name': customer.borrower_first_name,
-            'borrower_last_name': customer.borrower_last_name,
-            'is_eligible_to_call': customer.is_eligible_to_call,
-            'transfer_phone_number': customer.transfer_phone_number,
-            'transfer_ip_address': customer.transfer_ip_address,
-            'credit_score': customer.credit_score,
-            'monthly_income': customer.monthly_income,
-            'employment_status': customer.employment_status,
-            'created_at': customer.created_at.isoformat() if customer.created_at else None,
-            'loans': [{
-                'id': loan.id,
-                'product_name': loan.product_name,
-                'due_amount': loan.due_amount,
-                'no_of_missed_installments': loan.no_of_missed_installments,
-                'contractual_installment_amount': loan.contractual_installment_amount,
-                'interest_late_fee': loan.interest_late_fee,
-                'minimum_amount': loan.minimum_amount,
-                'due_date': loan.due_date.isoformat() if loan.due_date else None,
-                'status': loan.status
-            } for loan in customer.loans],
-            'interactions': [{
-                'id': interaction.id,
-                'creation_date': interaction.creation_date.isoformat() if interaction.creation_date else None,
-                'last_updated_date': interaction.last_updated_date.isoformat() if interaction.last_updated_date else None,
-                'source': interaction.source,
-                'status': interaction.status,
-                'notes': interaction.notes
-            } for interaction in customer.interactions]
-        })
+        # Only the requested columns; loans/interactions only when asked for
+        customer_query = customer_query.options(*field_load_options(Customer, CUSTOMER_DETAIL_FIELDS, names))
+    customer = customer_query.get_or_404(customer_id)
+    
+    if request.method == 'GET':
+        response = jsonify(serialize(customer, CUSTOMER_DETAIL_FIELDS, names))
+        response.set_etag(etag)
+        return response
     
     elif request.method == 'PUT':
         print(f"🔄 PUT request received for customer ID: {customer_id}")
@@ -321,24 +2376,24 @@ def customer_detail(customer_id):
 @app.route('/api/loans', methods=['GET', 'POST'])  # type: ignore
 def loans():
     if request.method == 'GET':
-        loans = Loan.query.all()
-        return jsonify([{
-            'id': loan.id,
-            'customer': f"{loan.customer.first_name} {loan.customer.last_name}",
-            'customer_id': loan.customer_id,
-            'vehicle': f"{loan.vehicle.year} {loan.vehicle.make} {loan.vehicle.model}" if loan.vehicle else None,
-            'product_name': loan.product_name,
-            'due_amount': loan.due_amount,
-            'no_of_missed_installments': loan.no_of_missed_installments,
-            'contractual_installment_amount': loan.contractual_installment_amount,
-            'interest_late_fee': loan.interest_late_fee,
-            'minimum_amount': loan.minimum_amount,
-            'due_date': loan.due_date.isoformat() if loan.due_date else None,
-            'acceptable_pay_later_date': loan.acceptable_pay_later_date.isoformat() if loan.acceptable_pay_later_date else None,
-            'acceptable_already_paid_date': loan.acceptable_already_paid_date.isoformat() if loan.acceptable_already_paid_date else None,
-            'grace_period_date': loan.grace_period_date.isoformat() if loan.grace_period_date else None,
-            'status': loan.status
-        } for loan in loans])
+        next_cursor = None
+        try:
+            names = requested_fields(LOAN_SUMMARY_FIELDS)
+            page = page_order(Loan, LOAN_PAGE_ORDERS)
+            statement, shape = list_select(Loan, LOAN_SUMMARY_FIELDS, names, page_sort_columns(page))
+            statement = statement.where(*loan_list_filters(request.args))
+            if wants_legacy_list():
+                # The full array is only sorted when an order is asked for
+                loans = read_rows(order_by_keys(statement, page) if 'order' in request.args else statement, shape)
+            else:
+                loans, next_cursor, limit = keyset_page(statement, page, lambda statement: read_rows(statement, shape))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        items = serialize_many(loans, LOAN_SUMMARY_FIELDS, names)
+        if wants_legacy_list():
+            return jsonify(items)
+        return jsonify({'loans': items, 'next_cursor': next_cursor, 'limit': limit})
     
     elif request.method == 'POST':
         data = request.get_json()
@@ -379,36 +2434,28 @@ def loans():
 
 @app.route('/api/loans/<int:loan_id>', methods=['GET', 'PUT', 'DELETE'])  # type: ignore
 def loan_detail(loan_id):
-    loan = Loan.query.get_or_404(loan_id)
+    if request.method == 'GET':
+        try:
+            names = requested_fields(LOAN_DETAIL_FIELDS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        etag = loan_etag(loan_id)
+        if etag is None:
+            abort(404)
+        etag = fields_etag(etag, LOAN_DETAIL_FIELDS, names)
+        if request.if_none_match.contains_weak(etag):
+            return not_modified(etag)
     
+    loan_query = Loan.query
     if request.method == 'GET':
-        return jsonify({
-            'id': loan.id,
-            'customer_id': loan.customer_id,
-            'customer': f"{loan.customer.first_name} {loan.customer.last_name}",
-            'vehicle_id': loan.vehicle_id,
-            'vehicle': f"{loan.vehicle.year} {loan.vehicle.make} {loan.vehicle.model}" if loan.vehicle else None,
-            'product_name': loan.product_name,
-            'due_amount': loan.due_amount,
-            'no_of_missed_installments': loan.no_of_missed_installments,
-            'contractual_installment_amount': loan.contractual_installment_amount,
-            'interest_late_fee': loan.interest_late_fee,
-            'minimum_amount': loan.minimum_amount,
-            'acceptable_pay_later_date': loan.acceptable_pay_later_date.isoformat() if loan.acceptable_pay_later_date else None,
-            'acceptable_already_paid_date': loan.acceptable_already_paid_date.isoformat() if loan.acceptable_already_paid_date else None,
-            'grace_period_date': loan.grace_period_date.isoformat() if loan.grace_period_date else None,
-            'due_date': loan.due_date.isoformat() if loan.due_date else None,
-            'loan_amount': loan.loan_amount,
-            'interest_rate': loan.interest_rate,
-            'term_months': loan.term_months,
-            'monthly_payment': loan.monthly_payment,
-            'balance_remaining': loan.balance_remaining,
-            'status': loan.status,
-            'next_payment_date': loan.next_payment_date.isoformat() if loan.next_payment_date else None,
-            'origination_date': loan.origination_date.isoformat() if loan.origination_date else None,
-            'days_past_due': loan.days_past_due,
-            'created_at': loan.created_at.isoformat() if loan.created_at else None
-        })
+        loan_query = loan_query.options(*field_load_options(Loan, LOAN_DETAIL_FIELDS, names))
+    loan = loan_query.get_or_404(loan_id)
+    
+    if request.method == 'GET':
+        response = jsonify(serialize(loan, LOAN_DETAIL_FIELDS, names))
+        response.set_etag(etag)
+        return response
     
     elif request.method == 'PUT':
         data = request.get_json()
@@ -479,10 +2526,9 @@ def fetch_user_profile_pre_call():
             }
         }), 400
     
-    # Convert caller_number to integer for database query
-    try:
-        caller_number_int = int(caller_number)
-    except ValueError:
+    # Normalize to E.164 so formatted numbers and country codes match the phone index
+    phone_number = normalize_phone_number(caller_number, app.config['PHONE_DEFAULT_COUNTRY_CODE'])
+    if not phone_number:
         return jsonify({
             "success": "False",
             "caller_details": [],
@@ -492,10 +2538,29 @@ def fetch_user_profile_pre_call():
             }
         }), 400
     
-    # Find customer by primary phone number
-    customer = Customer.query.filter_by(primary_phone_number=caller_number_int).first()
+    # Serve repeat lookups (e.g. dialer retries) straight from the cache
+    cached = caller_profile_cache.get(phone_number)
+    if cached is not None:
+        cached_body, etag = cached
+        if request.if_none_match.contains_weak(etag):
+            return not_modified(etag)
+        response = app.response_class(cached_body, mimetype=app.json.mimetype)
+        response.set_etag(etag)
+        return response
+    cache_version = caller_profile_cache.version()
+    
+    # Numbers the known caller filter has never seen can't have a caller card
+    unknown_caller = is_unknown_caller(phone_number)
+    row = None
+    if not unknown_caller:
+        # Single primary-key read of the denormalized caller card
+        row = db.session.execute(
+            db.select(CallerCard.__table__).where(CallerCard.phone_number == phone_number)
+        ).first()
+        if not row and known_caller_filter.ready:
+            known_caller_filter.record_false_positive()
     
-    if not customer:
+    if not row:
         return jsonify({
             "success": "False",
             "caller_details": [],
@@ -505,61 +2570,136 @@ def fetch_user_profile_pre_call():
             }
         }), 404
     
-    # Get the most recent loan for the customer
-    loan = Loan.query.filter_by(customer_id=customer.id).order_by(Loan.created_at.desc()).first()
-    
-    # Get the most recent interaction for the customer
-    interaction = CustomerInteraction.query.filter_by(customer_id=customer.id).order_by(CustomerInteraction.created_at.desc()).first()
-    
-    # Build the response
-    caller_details = {
-        "user_info": {
-            "account_number": customer.account_number,
-            "first_name": customer.first_name,
-            "last_name": customer.last_name,
-            "product_name": loan.product_name if loan else None,
-            "address_line_1": customer.address_line_1,
-            "address_line_2": customer.address_line_2,
-            "zip_code": customer.zip_code,
-            "city": customer.city,
-            "state": customer.state,
-            "ssn": customer.ssn,
-            "dob": customer.dob.isoformat() if customer.dob else None,
-            "primary_phone_number": customer.primary_phone_number,
-            "email_address": customer.email_address,
-            "due_amount": loan.due_amount if loan else None,
-            "no_of_missed_installments": loan.no_of_missed_installments if loan else None,
-            "contractual_installment_amount": loan.contractual_installment_amount if loan else None,
-            "interest_late_fee": loan.interest_late_fee if loan else None,
-            "minimum_amount": loan.minimum_amount if loan else None,
-            "customer_number": customer.customer_number,
-            "acceptable_pay_later_date": loan.acceptable_pay_later_date.isoformat() if loan and loan.acceptable_pay_later_date else None,
-            "acceptable_already_paid_date": loan.acceptable_already_paid_date.isoformat() if loan and loan.acceptable_already_paid_date else None,
-            "grace_period_date": loan.grace_period_date.isoformat() if loan and loan.grace_period_date else None,
-            "due_date": loan.due_date.isoformat() if loan and loan.due_date else None,
-            "record_type": customer.record_type,
-            "borrower_first_name": customer.borrower_first_name,
-            "borrower_last_name": customer.borrower_last_name,
-            "is_eligible_to_call": customer.is_eligible_to_call,
-            "transfer_phone_number": customer.transfer_phone_number,
-            "transfer_ip_address": customer.transfer_ip_address
-        },
-        "metadata": {
-            "creation_date": interaction.creation_date.isoformat() if interaction and interaction.creation_date else None,
-            "last_updated_date": interaction.last_updated_date.isoformat() if interaction and interaction.last_updated_date else None,
-            "source": interaction.source if interaction else None,
-            "status": interaction.status if interaction else None,
-            "notes": interaction.notes if interaction else None
-        }
-    }
+    response = pre_call_success_response(row)
+    cache_pre_call_response(phone_number, response, row.customer_id, version=cache_version)
+    return response.make_conditional(request)
+
+@app.route('/api/fetch_user_profile_pre_call/batch/', methods=['POST'])
+def fetch_user_profile_pre_call_batch():
+    """
+    Pre-call profiles for many caller numbers at once (dialer campaign prefetch).
+    Caller cards are read in chunks with IN queries and the response is streamed,
+    so memory stays flat regardless of batch size.
+    """
+    data = request.get_json(silent=True) or {}
+    caller_numbers = data.get('caller_numbers')
     
-    return jsonify({
-        "success": "True",
-        "caller_details": [caller_details],
-        "status": {
+    if not isinstance(caller_numbers, list) or not caller_numbers:
+        return jsonify({
+            "success": "False",
+            "caller_details": [],
+            "status": {
+                "type": "error",
+                "message": "caller_numbers must be a non-empty list"
+            }
+        }), 400
+    
+    max_numbers = app.config['PRE_CALL_BATCH_MAX_NUMBERS']
+    if len(caller_numbers) > max_numbers:
+        return jsonify({
+            "success": "False",
+            "caller_details": [],
+            "status": {
+                "type": "error",
+                "message": f"At most {max_numbers} caller_numbers are allowed per request"
+            }
+        }), 400
+    
+    # Validate, normalize and de-duplicate while keeping the dialer's order
+    country_code = app.config['PHONE_DEFAULT_COUNTRY_CODE']
+    requested = {}  # normalized number -> caller number as sent
+    for caller_number in caller_numbers:
+        phone_number = normalize_phone_number(caller_number, country_code) if isinstance(caller_number, (int, str)) else None
+        if not phone_number:
+            return jsonify({
+                "success": "False",
+                "caller_details": [],
+                "status": {
+                    "type": "error",
+                    "message": f"Invalid caller_number format: {caller_number}"
+                }
+            }), 400
+        requested.setdefault(phone_number, caller_number)
+    numbers = list(requested)
+    
+    chunk_size = app.config['PRE_CALL_BATCH_CHUNK_SIZE']
+    
+    def dumps(obj):
+        # Same compact encoding jsonify uses
+        return app.json.dumps(obj, separators=(',', ':'))
+    
+    def generate():
+        not_found = []
+        first = True
+        yield '{"success":"True","caller_details":['
+        
+        for start in range(0, len(numbers), chunk_size):
+            chunk = numbers[start:start + chunk_size]
+            candidates = [n for n in chunk if not is_unknown_caller(n)]
+            rows = db.session.execute(
+                db.select(CallerCard.__table__).where(CallerCard.phone_number.in_(candidates))
+            ) if candidates else ()
+            found = set()
+            for row in rows:
+                found.add(row.phone_number)
+                entry = {"caller_number": requested[row.phone_number], **build_caller_details(row)}
+                yield ('' if first else ',') + dumps(entry)
+                first = False
+            not_found.extend(requested[n] for n in chunk if n not in found)
+        
+        yield '],"not_found":' + dumps(not_found)
+        yield ',"status":' + dumps({
             "type": "success",
-            "message": "Successful"
-        }
+            "message": f"Resolved {len(numbers) - len(not_found)} of {len(numbers)} caller numbers"
+        }) + '}\n'
+    
+    return app.response_class(stream_with_context(generate()), mimetype=app.json.mimetype)
+
+@app.route('/api/export/<entity>', methods=['GET'])
+def export_entity(entity):
+    """
+    Stream every row of customers, loans or interactions as NDJSON (default)
+    or CSV (?format=csv). ?updated_since / ?updated_before (ISO 8601) limit
+    the export to rows changed in that window.
+    """
+    if entity not in EXPORT_MODELS:
+        return jsonify({'error': f"Unknown export: {entity}. Use one of: {', '.join(EXPORT_MODELS)}"}), 404
+    
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    
+    try:
+        updated_since = parse_export_datetime(request.args.get('updated_since'), 'updated_since')
+        updated_before = parse_export_datetime(request.args.get('updated_before'), 'updated_before')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response = app.response_class(
+        stream_with_context(iter_export(entity, export_format, updated_since, updated_before)),
+        mimetype=EXPORT_FORMATS[export_format]
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename={entity}.{export_format}'
+    return response
+
+@app.route('/api/cache-stats', methods=['GET'])
+def cache_stats():
+    """Hit/miss/eviction counters for the in-process caches of this worker"""
+    return jsonify({
+        'caller_profile_cache': caller_profile_cache.stats(),
+        'known_caller_filter': known_caller_filter.stats(),
+        'dashboard_cache': dashboard_cache.stats()
+    })
+
+@app.route('/api/compression-stats', methods=['GET'])
+def compression_stats_endpoint():
+    """Per-route compression ratio and CPU time of this worker"""
+    return jsonify({
+        'enabled': app.config['COMPRESSION_ENABLED'],
+        'codings': available_codings(),
+        'min_size': app.config['COMPRESSION_MIN_SIZE'],
+        'levels': {coding: app.config['COMPRESSION_LEVELS'][coding] for coding in available_codings()},
+        'routes': compression_stats.stats()
     })
 
 @app.route('/api/customers/<int:customer_id>/interactions', methods=['GET', 'POST'])  # type: ignore
@@ -567,17 +2707,25 @@ def customer_interactions(customer_id):
     customer = Customer.query.get_or_404(customer_id)
     
     if request.method == 'GET':
-        interactions = CustomerInteraction.query.filter_by(customer_id=customer_id).all()
-        return jsonify([{
-            'id': interaction.id,
-            'customer_id': interaction.customer_id,
-            'creation_date': interaction.creation_date.isoformat() if interaction.creation_date else None,
-            'last_updated_date': interaction.last_updated_date.isoformat() if interaction.last_updated_date else None,
-            'source': interaction.source,
-            'status': interaction.status,
-            'notes': interaction.notes,
-            'created_at': interaction.created_at.isoformat() if interaction.created_at else None
-        } for interaction in interactions])
+        next_cursor = None
+        try:
+            names = requested_fields(INTERACTION_FIELDS)
+            page = page_order(CustomerInteraction, INTERACTION_PAGE_ORDERS, INTERACTION_PAGE_DEFAULT_ORDER)
+            statement, shape = list_select(CustomerInteraction, INTERACTION_FIELDS, names, page_sort_columns(page))
+            statement = statement.where(CustomerInteraction.customer_id == customer_id)
+            if wants_legacy_list():
+                interactions = read_rows(statement, shape)
+            else:
+                interactions, next_cursor, limit = keyset_page(
+                    statement, page, lambda statement: read_rows(statement, shape)
+                )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        items = serialize_many(interactions, INTERACTION_FIELDS, names)
+        if wants_legacy_list():
+            return jsonify(items)
+        return jsonify({'interactions': items, 'next_cursor': next_cursor, 'limit': limit})
     
     elif request.method == 'POST':
         data = request.get_json()
@@ -602,23 +2750,22 @@ def customer_interactions(customer_id):
 def manage_customer_interaction(customer_id, interaction_id):
     """Manage individual customer interactions - get, update, or delete"""
     customer = Customer.query.get_or_404(customer_id)
-    interaction = CustomerInteraction.query.filter_by(
+    interaction_query = CustomerInteraction.query.filter_by(
         id=interaction_id, 
         customer_id=customer_id
-    ).first_or_404()
+    )
+    if request.method == 'GET':
+        try:
+            names = requested_fields(INTERACTION_DETAIL_FIELDS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        interaction_query = interaction_query.options(
+            *field_load_options(CustomerInteraction, INTERACTION_DETAIL_FIELDS, names)
+        )
+    interaction = interaction_query.first_or_404()
     
     if request.method == 'GET':
-        return jsonify({
-            'id': interaction.id,
-            'customer_id': interaction.customer_id,
-            'creation_date': interaction.creation_date.isoformat() if interaction.creation_date else None,
-            'last_updated_date': interaction.last_updated_date.isoformat() if interaction.last_updated_date else None,
-            'source': interaction.source,
-            'status': interaction.status,
-            'notes': interaction.notes,
-            'created_at': interaction.created_at.isoformat() if interaction.created_at else None,
-            'updated_at': interaction.updated_at.isoformat() if interaction.updated_at else None
-        })
+        return jsonify(serialize(interaction, INTERACTION_DETAIL_FIELDS, names))
     
     elif request.method == 'PUT':
         data = request.get_json()
@@ -652,17 +2799,7 @@ def manage_customer_interaction(customer_id, interaction_id):
         
         return jsonify({
             'message': 'Customer interaction updated successfully',
-            'interaction': {
-                'id': interaction.id,
-                'customer_id': interaction.customer_id,
-                'creation_date': interaction.creation_date.isoformat() if interaction.creation_date else None,
-                'last_updated_date': interaction.last_updated_date.isoformat() if interaction.last_updated_date else None,
-                'source': interaction.source,
-                'status': interaction.status,
-                'notes': interaction.notes,
-                'created_at': interaction.created_at.isoformat() if interaction.created_at else None,
-                'updated_at': interaction.updated_at.isoformat() if interaction.updated_at else None
-            }
+            'interaction': serialize(interaction, INTERACTION_DETAIL_FIELDS, INTERACTION_DETAIL_FIELDS)
         })
     
     elif request.method == 'DELETE':
@@ -678,270 +2815,155 @@ def post_call_outcomes():
     """
     Update customer records and create interaction logs based on call outcomes.
     This endpoint handles comprehensive updates to customer, loan, and interaction data.
+    
+    With ?mode=async (or POST_CALL_DEFAULT_MODE=async) the payload is validated,
+    journaled to the local outcome queue and acknowledged with 202 and a ticket id;
+    queue workers then apply it with the same semantics.
     """
     try:
         data = request.get_json()
         
-        if not data:
-            return jsonify({
-                "success": "False",
-                "message": "No data provided",
-                "status": {
-                    "type": "error",
-                    "message": "Request body is required"
-                }
-            }), 400
-        
-        # Extract sections from payload
-        user_info = data.get('user_info', {})
-        outcome_details = data.get('outcome_details', {})
-        metadata = data.get('metadata', {})
-        call_outcome_note = data.get('call_outcome_note', '')
-        
-        # Validate required fields
-        account_number = user_info.get('account_number')
-        if not account_number:
-            return jsonify({
-                "success": "False",
-                "message": "account_number is required in user_info",
-                "status": {
-                    "type": "error",
-                    "message": "Missing required field: account_number"
-                }
-            }), 400
-        
-        # Find customer by account number
-        customer = Customer.query.filter_by(account_number=account_number).first()
-        if not customer:
+        if request.args.get('mode', app.config['POST_CALL_DEFAULT_MODE']) == 'async':
+            error = validate_call_outcome(data)
+            if error:
+                response, status_code = error
+                return jsonify(response), status_code
+            
+            ticket_id = call_outcome_queue.enqueue(data)
+            call_outcome_worker.start()
+            call_outcome_worker.notify()
             return jsonify({
-                "success": "False",
-                "message": f"Customer not found with account number: {account_number}",
+                "success": "True",
+                "message": "Call outcome queued for processing",
+                "ticket_id": ticket_id,
+                "status_url": f"/api/post_call_outcomes/tickets/{ticket_id}",
                 "status": {
-                    "type": "error",
-                    "message": "Customer not found"
+                    "type": "accepted",
+                    "message": "Call outcome accepted"
                 }
-            }), 404
-        
-        # Update customer information if provided
-        customer_updated = False
-        for field, value in user_info.items():
-            if hasattr(customer, field) and value is not None:
-                # Handle date fields specially
-                if field == 'dob' and isinstance(value, str):
-                    try:
-                        value = datetime.strptime(value, '%Y-%m-%d').date()
-                    except ValueError:
-                        continue
-                
-                current_value = getattr(customer, field)
-                if current_value != value:
-                    setattr(customer, field, value)
-                    customer_updated = True
-        
-        if customer_updated:
-            customer.updated_at = datetime.utcnow()
-        
-        # Find and update loan information
-        loan = Loan.query.filter_by(customer_id=customer.id).order_by(Loan.created_at.desc()).first()
-        loan_updated = False
-        
-        if loan:
-            # Update loan fields from user_info
-            loan_fields = ['product_name', 'due_amount', 'no_of_missed_installments', 
-                          'contractual_installment_amount', 'interest_late_fee', 'minimum_amount']
-            
-            for field in loan_fields:
-                if field in user_info and user_info[field] is not None:
-                    current_value = getattr(loan, field)
-                    new_value = user_info[field]
-                    if current_value != new_value:
-                        setattr(loan, field, new_value)
-                        loan_updated = True
-            
-            # Update date fields
-            date_fields = ['acceptable_pay_later_date', 'acceptable_already_paid_date', 
-                          'grace_period_date', 'due_date']
-            
-            for field in date_fields:
-                if field in user_info and user_info[field]:
-                    try:
-                        new_date = datetime.strptime(user_info[field], '%Y-%m-%d').date()
-                        current_date = getattr(loan, field)
-                        if current_date != new_date:
-                            setattr(loan, field, new_date)
-                            loan_updated = True
-                    except ValueError:
-                        continue
-            
-            # Handle outcome-specific updates
-            if outcome_details.get('user_agreed_payment_amount'):
-                try:
-                    agreed_amount = float(outcome_details['user_agreed_payment_amount'])
-                    # Update due amount based on agreement
-                    if loan.due_amount != agreed_amount:
-                        loan.due_amount = agreed_amount
-                        loan_updated = True
-                except ValueError:
-                    pass
-            
-            if outcome_details.get('pay_later_date'):
-                try:
-                    pay_later_date = datetime.strptime(outcome_details['pay_later_date'], '%Y-%m-%d').date()
-                    if loan.acceptable_pay_later_date != pay_later_date:
-                        loan.acceptable_pay_later_date = pay_later_date
-                        loan_updated = True
-                except ValueError:
-                    pass
-            
-            # Update loan status based on disposition
-            final_disposition = outcome_details.get('final_disposition', '').lower()
-            if final_disposition in ['resolved', 'paid', 'current']:
-                if loan.status != 'current':
-                    loan.status = 'current'
-                    loan.no_of_missed_installments = 0
-                    loan.due_amount = 0.0
-                    loan_updated = True
-            elif final_disposition in ['promise_to_pay', 'callback_scheduled']:
-                if loan.status != 'arranged':
-                    loan.status = 'arranged'
-                    loan_updated = True
-            
-            if loan_updated:
-                loan.updated_at = datetime.utcnow()
-        
-        # Create comprehensive interaction record
-        interaction_data = {
-            'customer_id': customer.id,
-            'creation_date': datetime.utcnow(),
-            'last_updated_date': datetime.utcnow().date(),
-            'source': outcome_details.get('contact_type', 'Phone Call'),
-            'status': outcome_details.get('final_disposition', 'Completed'),
-            'notes': ''
-        }
-        
-        # Parse creation date if provided in metadata
-        if metadata.get('creation_date'):
-            try:
-                interaction_data['creation_date'] = datetime.strptime(
-                    metadata['creation_date'], '%Y-%m-%d %H:%M:%S.%f%z'
-                )
-            except ValueError:
-                try:
-                    interaction_data['creation_date'] = datetime.strptime(
-                        metadata['creation_date'], '%Y-%m-%d %H:%M:%S.%f-%H:%M'
-                    )
-                except ValueError:
-                    pass
-        
-        # Build comprehensive notes
-        notes_parts = []
-        
-        # Call details
-        if outcome_details.get('call_type'):
-            notes_parts.append(f"Call Type: {outcome_details['call_type']}")
-        
-        if outcome_details.get('call_duration'):
-            notes_parts.append(f"Duration: {outcome_details['call_duration']}")
-        
-        if outcome_details.get('call_identifier'):
-            notes_parts.append(f"Call ID: {outcome_details['call_identifier']}")
-        
-        # Disposition trace
-        if outcome_details.get('disposition_trace'):
-            trace = ' → '.join(outcome_details['disposition_trace'])
-            notes_parts.append(f"Disposition Trace: {trace}")
+            }), 202
         
-        # Payment details
-        if outcome_details.get('user_agreed_payment_amount'):
-            notes_parts.append(f"Agreed Payment Amount: ${outcome_details['user_agreed_payment_amount']}")
-        
-        if outcome_details.get('pay_later_date'):
-            notes_parts.append(f"Payment Date Agreed: {outcome_details['pay_later_date']}")
-        
-        # Call end details
-        if outcome_details.get('call_end_status'):
-            notes_parts.append(f"Call End: {outcome_details['call_end_status']}")
-        
-        # Dialing status
-        if outcome_details.get('dialing_status'):
-            dialing = outcome_details['dialing_status']
-            dialing_info = f"{dialing.get('long_code', '')} ({dialing.get('short_code', '')})"
-            if dialing.get('details'):
-                dialing_info += f" - {dialing['details']}"
-            notes_parts.append(f"Dialing Status: {dialing_info}")
-        
-        # Add call outcome note
-        if call_outcome_note:
-            notes_parts.append(f"Outcome Note: {call_outcome_note}")
-        
-        # Add metadata notes
-        if metadata.get('notes'):
-            notes_parts.append(f"Additional Notes: {metadata['notes']}")
-        
-        interaction_data['notes'] = '; '.join(notes_parts)
-        
-        # Create the interaction record
-        interaction = CustomerInteraction(**interaction_data)
-        db.session.add(interaction)
-        
-        # Commit all changes
-        db.session.commit()
-        
-        # Prepare response
-        response = {
-            "success": "True",
-            "message": "Call outcome processed successfully",
-            "updates": {
-                "customer_updated": customer_updated,
-                "loan_updated": loan_updated,
-                "interaction_created": True,
-                "interaction_id": interaction.id
-            },
-            "status": {
-                "type": "success",
-                "message": "Call outcome recorded and updates applied"
-            }
-        }
+        response, status_code = process_call_outcome(data)
+        if status_code == 200:
+            db.session.commit()
+        return jsonify(response), status_code
         
-        return jsonify(response), 200
+    except IntegrityError as e:
+        db.session.rollback()
+        # A concurrent request with the same call_identifier committed first
+        call_identifier = call_outcome_identifier(data)
+        replay = find_call_outcome_replays([call_identifier]).get(call_identifier)
+        if replay:
+            response, status_code = replay
+            return jsonify(response), status_code
+        return jsonify(call_outcome_error(e)), 500
         
     except Exception as e:
         # Rollback any changes in case of error
         db.session.rollback()
         
+        return jsonify(call_outcome_error(e)), 500
+
+@app.route('/api/post_call_outcomes/bulk/', methods=['POST'])
+def post_call_outcomes_bulk():
+    """
+    Apply many post-call outcomes in one request (e.g. a vendor replay after
+    an outage). Same rules as post_call_outcomes; customers and latest loans
+    are resolved per chunk with set-based queries and each chunk is committed
+    on its own. Every payload gets a result entry, in request order.
+    """
+    data = request.get_json(silent=True) or {}
+    outcomes = data.get('outcomes')
+    
+    if not isinstance(outcomes, list) or not outcomes:
         return jsonify({
             "success": "False",
-            "message": f"Internal server error: {str(e)}",
+            "results": [],
             "status": {
                 "type": "error",
-                "message": "Failed to process call outcome"
+                "message": "outcomes must be a non-empty list"
             }
-        }), 500
-
-@app.route('/api/dashboard-stats', methods=['GET'])
-def dashboard_stats():
-    total_customers = Customer.query.count()
-    total_loans = Loan.query.count()
-    active_loans = Loan.query.filter_by(status='active').count()
-    past_due_loans = Loan.query.filter(Loan.days_past_due > 0).count()
+        }), 400
+    
+    max_items = app.config['POST_CALL_BULK_MAX_ITEMS']
+    if len(outcomes) > max_items:
+        return jsonify({
+            "success": "False",
+            "results": [],
+            "status": {
+                "type": "error",
+                "message": f"At most {max_items} outcomes are allowed per request"
+            }
+        }), 400
     
-    total_portfolio = db.session.query(db.func.sum(Loan.balance_remaining)).scalar() or 0
+    results = process_call_outcomes_bulk(outcomes, app.config['POST_CALL_BULK_CHUNK_SIZE'])
+    succeeded = sum(1 for response, status_code in results if status_code == 200)
     
     return jsonify({
-        'total_customers': total_customers,
-        'total_loans': total_loans,
-        'active_loans': active_loans,
-        'past_due_loans': past_due_loans,
-        'total_portfolio': float(total_portfolio)
+        "success": "True" if succeeded == len(results) else "False",
+        "results": [
+            {"index": i, "status_code": status_code, **response}
+            for i, (response, status_code) in enumerate(results)
+        ],
+        "summary": {
+            "total": len(results),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded
+        },
+        "status": {
+            "type": "success" if succeeded == len(results) else "partial",
+            "message": f"Processed {succeeded} of {len(results)} call outcomes"
+        }
+    })
+
+@app.route('/api/post_call_outcomes/tickets/<ticket_id>', methods=['GET'])
+def post_call_outcome_ticket(ticket_id):
+    """Status and result of a queued call outcome"""
+    ticket = call_outcome_queue.get(ticket_id)
+    if ticket is None:
+        return jsonify({'error': 'Ticket not found'}), 404
+    return jsonify(ticket)
+
+@app.route('/api/post_call_outcomes/queue', methods=['GET'])
+def post_call_outcome_queue_stats():
+    """Outcome queue depth and lag metrics"""
+    return jsonify({
+        **call_outcome_queue.stats(),
+        'workers_running': call_outcome_worker.running
     })
 
+# Dashboard stats (polled by every supervisor screen)
+dashboard_cache = SingleFlightCache(ttl_seconds=app.config['DASHBOARD_CACHE_TTL_SECONDS'])
+
+def dashboard_aggregate():
+    """All dashboard figures from the maintained portfolio counters (one small indexed read)"""
+    counters = portfolio_counters('customers', 'loans', loan_status_counter('active'), 'past_due_loans',
+                                  'balance_remaining')
+    return {
+        'total_customers': int(counters['customers']),
+        'total_loans': int(counters['loans']),
+        'active_loans': int(counters[loan_status_counter('active')]),
+        'past_due_loans': int(counters['past_due_loans']),
+        # Running float sum: rounded to cents so the order of updates doesn't show
+        'total_portfolio': round(float(counters['balance_remaining']), 2)
+    }
+
+@app.route('/api/dashboard-stats', methods=['GET'])
+def dashboard_stats():
+    """
+    Portfolio totals, cached for DASHBOARD_CACHE_TTL_SECONDS. When the cache
+    is cold, concurrent requests wait for a single counter read instead of
+    each running their own.
+    """
+    return jsonify(dashboard_cache.get(dashboard_aggregate))
+
 # Health check and status endpoints
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint for Replit and monitoring"""
     try:
-        # Test database connection
-        customer_count = Customer.query.count()
+        # Test database connection (counts come from the maintained counters, not a table scan)
+        customer_count = int(portfolio_counters('customers')['customers'])
         
         return jsonify({
             'status': 'healthy',
@@ -962,10 +2984,11 @@ def health_check():
 def api_health():
     """API health check with more detailed information"""
     try:
-        # Comprehensive health check
-        customer_count = Customer.query.count()
-        loan_count = Loan.query.count()
-        interaction_count = CustomerInteraction.query.count()
+        # Comprehensive health check (one read of the maintained counters)
+        counters = portfolio_counters('customers', 'loans', 'interactions')
+        customer_count = int(counters['customers'])
+        loan_count = int(counters['loans'])
+        interaction_count = int(counters['interactions'])
         
         # Check if sample data exists
         has_sample_data = customer_count >= 5
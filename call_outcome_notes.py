@@ -0,0 +1,123 @@
+"""
+Human-readable call outcome notes
+Builds the '; '-joined notes string logged on post-call interactions and
+parses it back into fields (used to backfill the structured call outcome table)
+"""
+
+import re
+from datetime import datetime
+
+NOTES_SEPARATOR = '; '
+TRACE_SEPARATOR = ' → '
+
+# (field, label) in the order they appear in the notes
+NOTE_LABELS = [
+    ('call_type', 'Call Type'),
+    ('call_duration', 'Duration'),
+    ('call_identifier', 'Call ID'),
+    ('disposition_trace', 'Disposition Trace'),
+    ('agreed_payment_amount', 'Agreed Payment Amount'),
+    ('pay_later_date', 'Payment Date Agreed'),
+    ('call_end_status', 'Call End'),
+    ('dialing_status', 'Dialing Status'),
+    ('outcome_note', 'Outcome Note'),
+    ('additional_notes', 'Additional Notes'),
+]
+
+_FIELDS_BY_LABEL = {label: field for field, label in NOTE_LABELS}
+_PART = re.compile(r'^(%s): (.*)$' % '|'.join(re.escape(label) for field, label in NOTE_LABELS), re.S)
+_DIALING_STATUS = re.compile(r'^(.*?) \((.*?)\)(?: - (.*))?$', re.S)
+
+
+def format_call_outcome_notes(outcome_details, call_outcome_note='', metadata_notes=None):
+    """Build the notes string for a post-call interaction"""
+    notes_parts = []
+
+    # Call details
+    if outcome_details.get('call_type'):
+        notes_parts.append(f"Call Type: {outcome_details['call_type']}")
+
+    if outcome_details.get('call_duration'):
+        notes_parts.append(f"Duration: {outcome_details['call_duration']}")
+
+    if outcome_details.get('call_identifier'):
+        notes_parts.append(f"Call ID: {outcome_details['call_identifier']}")
+
+    # Disposition trace
+    if outcome_details.get('disposition_trace'):
+        trace = TRACE_SEPARATOR.join(outcome_details['disposition_trace'])
+        notes_parts.append(f"Disposition Trace: {trace}")
+
+    # Payment details
+    if outcome_details.get('user_agreed_payment_amount'):
+        notes_parts.append(f"Agreed Payment Amount: ${outcome_details['user_agreed_payment_amount']}")
+
+    if outcome_details.get('pay_later_date'):
+        notes_parts.append(f"Payment Date Agreed: {outcome_details['pay_later_date']}")
+
+    # Call end details
+    if outcome_details.get('call_end_status'):
+        notes_parts.append(f"Call End: {outcome_details['call_end_status']}")
+
+    # Dialing status
+    if outcome_details.get('dialing_status'):
+        dialing = outcome_details['dialing_status']
+        dialing_info = f"{dialing.get('long_code', '')} ({dialing.get('short_code', '')})"
+        if dialing.get('details'):
+            dialing_info += f" - {dialing['details']}"
+        notes_parts.append(f"Dialing Status: {dialing_info}")
+
+    # Add call outcome note
+    if call_outcome_note:
+        notes_parts.append(f"Outcome Note: {call_outcome_note}")
+
+    # Add metadata notes
+    if metadata_notes:
+        notes_parts.append(f"Additional Notes: {metadata_notes}")
+
+    return NOTES_SEPARATOR.join(notes_parts)
+
+
+def parse_amount(value):
+    """Float from '$125.50' / '125.5' / 125.5, or None"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(str(value).lstrip('$').replace(',', ''))
+    except ValueError:
+        return None
+
+
+def parse_date(value):
+    """date from 'YYYY-MM-DD', or None"""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(str(value), '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def parse_call_outcome_notes(notes):
+    """
+    Split a notes string built by format_call_outcome_notes() back into raw
+    string fields. Free text containing '; ' stays attached to the field it
+    belongs to. Returns {} when no labelled part is found.
+    """
+    fields = {}
+    current = None
+    for part in (notes or '').split(NOTES_SEPARATOR):
+        match = _PART.match(part)
+        if match and _FIELDS_BY_LABEL[match.group(1)] not in fields:
+            current = _FIELDS_BY_LABEL[match.group(1)]
+            fields[current] = match.group(2)
+        elif current is not None:
+            fields[current] += NOTES_SEPARATOR + part
+
+    if 'dialing_status' in fields:
+        match = _DIALING_STATUS.match(fields['dialing_status'])
+        if match:
+            for field, value in zip(('dialing_long_code', 'dialing_short_code', 'dialing_details'), match.groups()):
+                fields[field] = value or None
+        del fields['dialing_status']
+    return fields
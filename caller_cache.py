@@ -0,0 +1,127 @@
+"""
+In-process cache for pre-call caller profiles
+Bounded LRU with a per-entry TTL, keyed by caller phone number
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class CallerProfileCache:
+    """Thread-safe LRU/TTL cache of serialized pre-call responses.
+
+    Entries are keyed by phone number and remember which customer they
+    belong to, so every cached number for a customer can be dropped when
+    that customer (or one of their loans/interactions) is written.
+    """
+
+    def __init__(self, max_entries=10000, ttl_seconds=300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (payload, customer_id, expires_at)
+        self._keys_by_customer = {}
+        self._lock = threading.Lock()
+        self._version = 0
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0,
+            'stale_fills_skipped': 0
+        }
+
+    def version(self):
+        """Return the invalidation counter; pass it back to set()"""
+        return self._version
+
+    def get(self, key):
+        """Return the cached payload for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+
+            payload, customer_id, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return payload
+
+    def set(self, key, payload, customer_id, version=None):
+        """Store payload for key; returns True if it was stored.
+
+        If version is given and an invalidation happened since it was read,
+        the payload may already be stale and is not stored.
+        """
+        if self.max_entries <= 0:
+            return False
+
+        with self._lock:
+            if version is not None and version != self._version:
+                self._stats['stale_fills_skipped'] += 1
+                return False
+
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (payload, customer_id, time.monotonic() + self.ttl_seconds)
+            self._keys_by_customer.setdefault(customer_id, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self._stats['evictions'] += 1
+            return True
+
+    def invalidate_customer(self, customer_id):
+        """Drop every cached number belonging to customer_id"""
+        with self._lock:
+            self._version += 1
+            for key in self._keys_by_customer.pop(customer_id, ()):
+                self._entries.pop(key, None)
+                self._stats['invalidations'] += 1
+
+    def invalidate_keys(self, keys):
+        """Drop the cached entries of keys, whichever customer they were stored for"""
+        with self._lock:
+            self._version += 1
+            for key in keys:
+                if key in self._entries:
+                    self._remove(key)
+                    self._stats['invalidations'] += 1
+
+    def clear(self):
+        """Drop all entries (counters are kept)"""
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            self._keys_by_customer.clear()
+
+    def stats(self):
+        """Return a snapshot of the cache counters"""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hit_rate': round(self._stats['hits'] / lookups, 4) if lookups else 0.0
+            }
+
+    def _remove(self, key):
+        # Caller must hold the lock
+        payload, customer_id, expires_at = self._entries.pop(key)
+        keys = self._keys_by_customer.get(customer_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_customer[customer_id]
@@ -0,0 +1,166 @@
+"""
+Negative-lookup filter for unknown caller numbers
+A Bloom filter over every indexed phone number: a "no" is definite, so the
+pre-call lookup can answer unknown callers without touching the database.
+"""
+
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (no deletes)"""
+
+    def __init__(self, capacity, false_positive_rate=0.01):
+        capacity = max(int(capacity), 1)
+        self.capacity = capacity
+        self.false_positive_rate = false_positive_rate
+        self.num_bits = max(int(math.ceil(-capacity * math.log(false_positive_rate) / (math.log(2) ** 2))), 8)
+        self.num_hashes = max(int(round(self.num_bits / capacity * math.log(2))), 1)
+        self.count = 0
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item):
+        added = False
+        for position in self._positions(item):
+            mask = 1 << (position & 7)
+            if not self._bits[position >> 3] & mask:
+                self._bits[position >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+
+    def __contains__(self, item):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def expected_false_positive_rate(self):
+        """Theoretical false-positive rate at the current fill"""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+    @property
+    def memory_bytes(self):
+        return len(self._bits)
+
+
+class KnownCallerFilter:
+    """
+    Bloom filter of known caller numbers, built from the phone index.
+
+    Rows are (id, phone_number) pairs; the highest id seen is remembered so
+    numbers indexed by other worker processes can be picked up incrementally.
+    Syncs re-read the last sync_lookback ids because transactions can commit
+    out of id order (adding a number twice is harmless).
+    """
+
+    def __init__(self, false_positive_rate=0.01, refresh_seconds=2.0, headroom=2.0, min_capacity=1024,
+                 sync_lookback=1000):
+        self.false_positive_rate = false_positive_rate
+        self.refresh_seconds = refresh_seconds
+        self.headroom = headroom
+        self.min_capacity = min_capacity
+        self.sync_lookback = sync_lookback
+        self.high_water_id = 0
+        self._bloom = None
+        self._lock = threading.Lock()
+        self._last_sync = 0.0
+        self._built_at = None
+        self._build_seconds = None
+        self._stats = {
+            'definite_misses': 0,
+            'possible_hits': 0,
+            'false_positives': 0,
+            'rebuilds': 0
+        }
+
+    @property
+    def ready(self):
+        return self._bloom is not None
+
+    def build(self, rows, expected_count):
+        """Replace the filter with one sized for expected_count numbers"""
+        started = time.monotonic()
+        bloom = BloomFilter(max(expected_count * self.headroom, self.min_capacity), self.false_positive_rate)
+        high_water_id = 0
+        for row_id, phone_number in rows:
+            bloom.add(phone_number)
+            high_water_id = max(high_water_id, row_id)
+
+        with self._lock:
+            self._bloom = bloom
+            self.high_water_id = high_water_id
+            self._last_sync = time.monotonic()
+            self._built_at = datetime.utcnow().isoformat()
+            self._build_seconds = round(self._last_sync - started, 4)
+            self._stats['rebuilds'] += 1
+
+    @property
+    def sync_from_id(self):
+        """Rows with an id above this may not have been seen yet"""
+        return max(self.high_water_id - self.sync_lookback, 0)
+
+    def needs_sync(self):
+        return time.monotonic() - self._last_sync >= self.refresh_seconds
+
+    def needs_rebuild(self):
+        """True once the filter holds more numbers than it was sized for"""
+        return self._bloom is None or self._bloom.count > self._bloom.capacity
+
+    def sync(self, rows):
+        """Add rows indexed since the last build/sync"""
+        with self._lock:
+            for row_id, phone_number in rows:
+                self._bloom.add(phone_number)
+                self.high_water_id = max(self.high_water_id, row_id)
+            self._last_sync = time.monotonic()
+
+    def add(self, phone_number):
+        if self._bloom is not None:
+            with self._lock:
+                self._bloom.add(phone_number)
+
+    def definitely_missing(self, phone_number):
+        """True if phone_number is certainly not indexed (False when unsure or not built)"""
+        if self._bloom is None:
+            return False
+        if phone_number in self._bloom:
+            self._stats['possible_hits'] += 1
+            return False
+        self._stats['definite_misses'] += 1
+        return True
+
+    def record_false_positive(self):
+        """Call when a number the filter let through turned out to be unknown"""
+        self._stats['false_positives'] += 1
+
+    def stats(self):
+        bloom = self._bloom
+        negatives = self._stats['definite_misses'] + self._stats['false_positives']
+        stats = {
+            **self._stats,
+            'ready': bloom is not None,
+            'observed_false_positive_rate': round(self._stats['false_positives'] / negatives, 6) if negatives else 0.0,
+            'target_false_positive_rate': self.false_positive_rate,
+            'refresh_seconds': self.refresh_seconds,
+            'high_water_id': self.high_water_id,
+            'built_at': self._built_at,
+            'build_seconds': self._build_seconds
+        }
+        if bloom is not None:
+            stats.update({
+                'numbers': bloom.count,
+                'capacity': bloom.capacity,
+                'bits': bloom.num_bits,
+                'hash_functions': bloom.num_hashes,
+                'memory_bytes': bloom.memory_bytes,
+                'expected_false_positive_rate': round(bloom.expected_false_positive_rate(), 6)
+            })
+        return stats
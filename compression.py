@@ -0,0 +1,123 @@
+"""
+HTTP response compression
+Content codings for JSON/NDJSON/CSV responses: gzip always, brotli and zstd
+when the `brotli` / `zstandard` packages are installed. Whole bodies are
+compressed in one call; streamed bodies chunk by chunk, flushing after each
+chunk so clients can decode as the rows arrive.
+"""
+
+import threading
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def available_codings():
+    """Supported content codings, preferred first (used to break ties in Accept-Encoding)"""
+    codings = []
+    if zstandard is not None:
+        codings.append('zstd')
+    if brotli is not None:
+        codings.append('br')
+    codings.append('gzip')
+    return codings
+
+
+def compress(data, coding, level):
+    """Compress a complete body"""
+    if coding == 'gzip':
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        return compressor.compress(data) + compressor.flush()
+    if coding == 'br':
+        return brotli.compress(data, quality=level)
+    if coding == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    raise ValueError(f"Unsupported content coding: {coding}")
+
+
+class StreamCompressor:
+    """Incremental compressor: compress() returns the bytes decodable so far, finish() the trailer"""
+
+    def __init__(self, coding, level):
+        self.coding = coding
+        if coding == 'gzip':
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        elif coding == 'br':
+            self._compressor = brotli.Compressor(quality=level)
+        elif coding == 'zstd':
+            self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        else:
+            raise ValueError(f"Unsupported content coding: {coding}")
+
+    def compress(self, chunk):
+        if self.coding == 'gzip':
+            return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        if self.coding == 'br':
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        if self.coding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+class CompressionStats:
+    """Thread-safe per-route counters: bytes before/after compression and CPU time spent"""
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def _route(self, route):
+        counters = self._routes.get(route)
+        if counters is None:
+            counters = self._routes[route] = {
+                'compressed': 0,
+                'skipped_small': 0,
+                'bytes_in': 0,
+                'bytes_out': 0,
+                'cpu_seconds': 0.0,
+                'codings': {}
+            }
+        return counters
+
+    def record(self, route, coding, bytes_in, bytes_out, cpu_seconds):
+        with self._lock:
+            counters = self._route(route)
+            counters['compressed'] += 1
+            counters['bytes_in'] += bytes_in
+            counters['bytes_out'] += bytes_out
+            counters['cpu_seconds'] += cpu_seconds
+            counters['codings'][coding] = counters['codings'].get(coding, 0) + 1
+
+    def record_skip(self, route):
+        with self._lock:
+            self._route(route)['skipped_small'] += 1
+
+    def stats(self):
+        with self._lock:
+            routes = {}
+            for route, counters in self._routes.items():
+                compressed = counters['compressed']
+                routes[route] = {
+                    **counters,
+                    'codings': dict(counters['codings']),
+                    'cpu_seconds': round(counters['cpu_seconds'], 6),
+                    # Compressed size as a fraction of the original (lower is better)
+                    'ratio': round(counters['bytes_out'] / counters['bytes_in'], 4) if counters['bytes_in'] else None,
+                    'cpu_ms_per_response': round(counters['cpu_seconds'] * 1000 / compressed, 3) if compressed else None
+                }
+            return routes
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
@@ -0,0 +1,57 @@
+"""
+Customer search documents and queries
+A customer's searchable fields are flattened into one normalized document
+(lowercase, accents stripped, split into letters/digits runs) so SQLite FTS5
+and PostgreSQL full-text search see exactly the same tokens.
+"""
+
+import re
+import unicodedata
+
+_TOKEN = re.compile(r'[^\W_]+')
+_NON_DIGITS = re.compile(r'\D')
+
+
+def search_tokens(text):
+    """Lowercase, accent-free word tokens of text"""
+    if not text:
+        return []
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return _TOKEN.findall(text.lower())
+
+
+def search_document(names, email_address, account_number, phone_numbers):
+    """
+    The indexed text for a customer: every name, the local part of the email
+    address, the account number and the digits of each phone number (as
+    stored and in E.164 form, so both '5551234567' and '1555...' prefixes
+    match). Email domains are left out: a few domains are shared by most
+    customers, and ranking a token that matches a third of the table is slow.
+    """
+    tokens = []
+    for name in names:
+        tokens.extend(search_tokens(name))
+    tokens.extend(search_tokens((email_address or '').rpartition('@')[0] or email_address))
+    tokens.extend(search_tokens(account_number))
+    for phone_number in phone_numbers:
+        digits = _NON_DIGITS.sub('', str(phone_number or ''))
+        if digits and digits not in tokens:
+            tokens.append(digits)
+    return ' '.join(tokens)
+
+
+def query_tokens(query):
+    """Tokens of a search query; like in the index, an email address's domain is ignored"""
+    local_part, at, domain = (query or '').partition('@')
+    return search_tokens(local_part if at and local_part.strip() else query)
+
+
+def fts5_match_query(tokens):
+    """FTS5 MATCH expression: every token as a prefix ('"jo"* "doe"*')"""
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def tsquery(tokens):
+    """PostgreSQL to_tsquery('simple', ...) expression: every token as a prefix"""
+    return ' & '.join(f'{token}:*' for token in tokens)
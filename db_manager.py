@@ -8,7 +8,14 @@ import os
 import sys
 import click
 from datetime import datetime
-from app import app, db, Customer, Loan, CustomerInteraction
+from app import (app, db, Customer, Loan, CustomerInteraction, rebuild_phone_index, rebuild_caller_cards,
+                 warm_caller_profile_cache, caller_profile_cache, upgrade_schema, backfill_call_outcomes,
+                 iter_export, parse_export_datetime, EXPORT_MODELS, EXPORT_FORMATS, check_loan_list_indexes,
+                 rebuild_customer_search, Vehicle, Payment, CUSTOMER_SUMMARY_FIELDS, CUSTOMER_DETAIL_FIELDS,
+                 LOAN_SUMMARY_FIELDS, INTERACTION_FIELDS, VEHICLE_FIELDS, PAYMENT_FIELDS, field_load_options,
+                 list_select, read_rows, reconcile_portfolio_counters)
+from serializers import serialize_many
+from fast_json import orjson
 from database_config import DatabaseConfig
 
 @click.group()
@@ -167,27 +174,27 @@ def query(query):
                 click.echo("❌ Only SELECT queries are allowed for safety")
                 return
             
-                         result = db.session.execute(query)
-             rows = result.fetchall()
+            result = db.session.execute(db.text(query))
+            rows = result.fetchall()
              
-             if not rows:
-                 click.echo("🔍 No results found")
-                 return
+            if not rows:
+                click.echo("🔍 No results found")
+                return
              
-             # Display results
-             click.echo(f"📊 Found {len(rows)} results:")
-             click.echo("-" * 50)
+            # Display results
+            click.echo(f"📊 Found {len(rows)} results:")
+            click.echo("-" * 50)
              
-             for i, row in enumerate(rows, 1):
-                 try:
-                     # Handle different SQLAlchemy versions
-                     row_dict = dict(row._mapping) if hasattr(row, '_mapping') else dict(row)
-                     click.echo(f"{i}: {row_dict}")
-                 except:
-                     click.echo(f"{i}: {row}")
-                 if i >= 10:  # Limit output
-                     click.echo(f"... and {len(rows) - 10} more rows")
-                     break
+            for i, row in enumerate(rows, 1):
+                try:
+                    # Handle different SQLAlchemy versions
+                    row_dict = dict(row._mapping) if hasattr(row, '_mapping') else dict(row)
+                    click.echo(f"{i}: {row_dict}")
+                except:
+                    click.echo(f"{i}: {row}")
+                if i >= 10:  # Limit output
+                    click.echo(f"... and {len(rows) - 10} more rows")
+                    break
                     
         except Exception as e:
             click.echo(f"❌ Query error: {e}")
@@ -254,7 +261,7 @@ def info():
                 
                 # Count records
                 try:
-                    count = db.session.execute(f"SELECT COUNT(*) FROM {table}").scalar()
+                    count = db.session.execute(db.text(f"SELECT COUNT(*) FROM {table}")).scalar()
                     click.echo(f"  Records: {count}")
                 except:
                     click.echo(f"  Records: Unable to count")
@@ -262,5 +269,369 @@ def info():
         except Exception as e:
             click.echo(f"❌ Error getting database info: {e}")
 
+@cli.command('upgrade-schema')
+def upgrade_schema_command():
+    """Add columns and indexes introduced since the database was created"""
+    with app.app_context():
+        try:
+            db.create_all()
+            applied = upgrade_schema()
+            for change in applied:
+                click.echo(f"🔧 Added {change}")
+            click.echo(f"✅ Schema up to date ({len(applied)} changes applied)")
+        except Exception as e:
+            click.echo(f"❌ Error upgrading schema: {e}")
+            sys.exit(1)
+
+@cli.command('check-loan-indexes')
+@click.option('--verbose', '-v', is_flag=True, help='Print the full query plan of each check')
+def check_loan_indexes(verbose):
+    """Check that the common loan list filters are served by their indexes"""
+    with app.app_context():
+        try:
+            db.create_all()
+            upgrade_schema()
+            results = check_loan_list_indexes()
+        except Exception as e:
+            click.echo(f"❌ Error checking loan indexes: {e}")
+            sys.exit(1)
+        
+        for query_string, index, uses_index, plan in results:
+            click.echo(f"{'✅' if uses_index else '❌'} /api/loans?{query_string} → {index}")
+            if verbose or not uses_index:
+                for line in plan:
+                    click.echo(f"     {line}")
+        missing = sum(1 for result in results if not result[2])
+        if missing:
+            click.echo(f"❌ {missing} of {len(results)} loan list queries do not use their index")
+            sys.exit(1)
+        click.echo(f"✅ All {len(results)} loan list queries use their index")
+
+@cli.command('rebuild-phone-index')
+def rebuild_phone_index_command():
+    """Rebuild the normalized phone number index used for caller lookup"""
+    with app.app_context():
+        try:
+            db.create_all()
+            upgrade_schema()
+            written = rebuild_phone_index()
+            click.echo(f"✅ Phone index rebuilt: {written} numbers for {Customer.query.count()} customers")
+            
+            # Caller cards are keyed by the indexed numbers
+            written = rebuild_caller_cards()
+            click.echo(f"✅ Caller cards rebuilt: {written} cards")
+        except Exception as e:
+            db.session.rollback()
+            click.echo(f"❌ Error rebuilding phone index: {e}")
+            sys.exit(1)
+
+@cli.command('rebuild-caller-cards')
+def rebuild_caller_cards_command():
+    """Rebuild the denormalized caller card table used by the pre-call lookup"""
+    with app.app_context():
+        try:
+            db.create_all()
+            upgrade_schema()
+            start = datetime.now()
+            written = rebuild_caller_cards()
+            elapsed = (datetime.now() - start).total_seconds()
+            click.echo(f"✅ Caller cards rebuilt: {written} cards in {elapsed:.2f}s")
+        except Exception as e:
+            db.session.rollback()
+            click.echo(f"❌ Error rebuilding caller cards: {e}")
+            sys.exit(1)
+
+@cli.command('rebuild-customer-search')
+@click.option('--chunk-size', type=int, default=1000, help='Customers indexed per INSERT')
+def rebuild_customer_search_command(chunk_size):
+    """Rebuild the customer search index behind /api/customers/search"""
+    with app.app_context():
+        try:
+            db.create_all()
+            start = datetime.now()
+            with db.engine.begin() as conn:
+                written = rebuild_customer_search(conn, chunk_size=chunk_size)
+            elapsed = (datetime.now() - start).total_seconds()
+            click.echo(f"✅ Indexed {written} customers for search in {elapsed:.1f}s")
+        except Exception as e:
+            click.echo(f"❌ Error rebuilding customer search index: {e}")
+            sys.exit(1)
+
+@cli.command('reconcile-counters')
+@click.option('--dry-run', is_flag=True, help='Only report drift; leave the stored counters unchanged')
+def reconcile_counters(dry_run):
+    """Recompute the portfolio counters (dashboard/health totals) from the tables and report drift"""
+    with app.app_context():
+        try:
+            db.create_all()
+            start = datetime.now()
+            with db.engine.connect() as conn:
+                drift = reconcile_portfolio_counters(conn)
+                if dry_run:
+                    conn.rollback()
+                else:
+                    conn.commit()
+            elapsed = (datetime.now() - start).total_seconds()
+        except Exception as e:
+            click.echo(f"❌ Error reconciling counters: {e}")
+            sys.exit(1)
+        
+        for name, (stored, actual) in drift.items():
+            stored_text = 'missing' if stored is None else f"{stored:g}"
+            click.echo(f"⚠️  {name}: stored {stored_text}, actual {actual:g} (drift {actual - (stored or 0):+g})")
+        if not drift:
+            click.echo(f"✅ Counters match the tables ({elapsed:.2f}s)")
+        elif dry_run:
+            click.echo(f"❌ {len(drift)} counters drifted (dry run: not corrected)")
+            sys.exit(1)
+        else:
+            click.echo(f"✅ Corrected {len(drift)} counters ({elapsed:.2f}s)")
+
+@cli.command('backfill-call-outcomes')
+@click.option('--chunk-size', type=int, default=1000, help='Interactions read and committed per chunk')
+def backfill_call_outcomes_command(chunk_size):
+    """Parse existing post-call interaction notes into structured call outcome rows"""
+    with app.app_context():
+        try:
+            db.create_all()
+            upgrade_schema()
+            start = datetime.now()
+            scanned, written = backfill_call_outcomes(chunk_size)
+            elapsed = (datetime.now() - start).total_seconds()
+            click.echo(f"✅ Call outcomes backfilled: {written} rows from {scanned} interactions in {elapsed:.2f}s")
+        except Exception as e:
+            db.session.rollback()
+            click.echo(f"❌ Error backfilling call outcomes: {e}")
+            sys.exit(1)
+
+@cli.command()
+@click.argument('entity', type=click.Choice(list(EXPORT_MODELS)))
+@click.option('--format', 'export_format', type=click.Choice(list(EXPORT_FORMATS)), default='ndjson', help='Output format')
+@click.option('--output', '-o', type=click.Path(dir_okay=False, writable=True), default='-', help='Output file (default: stdout)')
+@click.option('--updated-since', default=None, help='Only rows with updated_at >= this ISO date/datetime')
+@click.option('--updated-before', default=None, help='Only rows with updated_at < this ISO date/datetime')
+@click.option('--chunk-size', type=int, default=None, help='Rows fetched per round trip')
+def export(entity, export_format, output, updated_since, updated_before, chunk_size):
+    """Stream a full or incremental export of customers, loans or interactions"""
+    with app.app_context():
+        try:
+            updated_since = parse_export_datetime(updated_since, '--updated-since')
+            updated_before = parse_export_datetime(updated_before, '--updated-before')
+        except ValueError as e:
+            click.echo(f"❌ {e}", err=True)
+            sys.exit(1)
+        
+        start = datetime.now()
+        with click.open_file(output, 'w', encoding='utf-8') as f:
+            for chunk in iter_export(entity, export_format, updated_since, updated_before, chunk_size):
+                f.write(chunk)
+        elapsed = (datetime.now() - start).total_seconds()
+        if output != '-':
+            click.echo(f"✅ Exported {entity} to {output} in {elapsed:.2f}s")
+
+def synthetic_rows(count):
+    """Unsaved customers, vehicles, loans, interactions and payments for benchmarks (no database needed)"""
+    from datetime import date, timedelta
+    start = datetime(2024, 1, 1, 9, 30)
+    customers, vehicles, loans, interactions, payments = [], [], [], [], []
+    for i in range(1, count + 1):
+        customer = Customer(
+            id=i, account_number=f'{1000000000 + i}', first_name=f'First{i}', last_name=f'Last{i}',
+            email_address=f'first{i}.last{i}@email.com', primary_phone_number=5550000000 + i, ssn=100000000 + i,
+            dob=date(1960, 1, 1) + timedelta(days=i % 12000), address_line_1=f'{i} Main Street', city='Springfield',
+            state='IL', zip_code=62701, customer_number=10000 + i, record_type='responsible_party',
+            borrower_first_name=f'First{i}', borrower_last_name=f'Last{i}', is_eligible_to_call=i % 7 != 0,
+            transfer_phone_number=5551000000 + i, transfer_ip_address='192.168.1.100', created_at=start
+        )
+        vehicle = Vehicle(id=i, vin=f'VIN{i:014d}', make='Toyota', model='Camry', year=2015 + i % 10,
+                          mileage=30000 + i, color='Blue', condition='good', market_value=18250.5, created_at=start)
+        loan = Loan(
+            id=i, customer=customer, customer_id=i, vehicle=vehicle if i % 3 else None, vehicle_id=i if i % 3 else None,
+            product_name='Auto Loan Standard', due_amount=1250.0 + i % 100, no_of_missed_installments=i % 4,
+            contractual_installment_amount=425.5, interest_late_fee=25.0, minimum_amount=50.0,
+            grace_period_date=date(2024, 2, 5), due_date=date(2024, 1, 31), status='active', days_past_due=i % 90,
+            created_at=start
+        )
+        customers.append(customer)
+        vehicles.append(vehicle)
+        loans.append(loan)
+        interactions.append(CustomerInteraction(
+            id=i, customer_id=i, creation_date=start + timedelta(minutes=i), last_updated_date=date(2024, 1, 2),
+            source='Outbound Call', status='Completed', notes='Customer promised to pay by Friday.', created_at=start
+        ))
+        payments.append(Payment(id=i, loan_id=i, amount=425.5, payment_date=date(2024, 1, 15), payment_method='ach',
+                                reference_number=f'ACH{i:08d}', created_at=start))
+    # Instances loaded from the database carry every column, unset ones as None
+    for rows in (customers, vehicles, loans, interactions, payments):
+        for row in rows:
+            for column in row.__table__.columns:
+                if column.key not in row.__dict__:
+                    setattr(row, column.key, None)
+    # Detail views embed a customer's loans and recent interactions
+    customers[0].interactions = interactions[:20]
+    customers[0]._recent_interactions = (interactions[:20], 20, None)
+    return customers, vehicles, loans, interactions, payments
+
+@cli.command('benchmark-serializers')
+@click.option('--rows', type=int, default=10000, help='Rows per list')
+@click.option('--repeat', type=int, default=5, help='Runs per case (best time is reported)')
+def benchmark_serializers(rows, repeat):
+    """Time response serialization: compiled serializers + fast encoder vs per-field getters + json.dumps"""
+    import gc
+    import time
+    from flask.json.provider import DefaultJSONProvider
+    
+    with app.app_context():
+        customers, vehicles, loans, interactions, payments = synthetic_rows(rows)
+        reference_json = DefaultJSONProvider(app)
+        cases = [
+            ('customers list', customers, CUSTOMER_SUMMARY_FIELDS),
+            ('loans list', loans, LOAN_SUMMARY_FIELDS),
+            ('interactions list', interactions, INTERACTION_FIELDS),
+            ('vehicles', vehicles, VEHICLE_FIELDS),
+            ('payments', payments, PAYMENT_FIELDS),
+            ('customer detail x100', customers[:1] * 100, CUSTOMER_DETAIL_FIELDS),
+        ]
+        
+        def best_of(run):
+            # Collector pauses land on whichever run allocates past the threshold; keep them out (as timeit does)
+            times = []
+            gc.disable()
+            try:
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    body = run()
+                    times.append(time.perf_counter() - started)
+            finally:
+                gc.enable()
+            return min(times), body
+        
+        click.echo(f"🔤 JSON encoder: {'orjson ' + orjson.__version__ if orjson else 'json (orjson not installed)'}")
+        click.echo("   Times in ms (best of --repeat): dict building, encoding, total; before -> after")
+        click.echo(f"{'case':<22}{'rows':>7}{'dicts':>16}{'encode':>16}{'total':>16}{'speedup':>9}  identical")
+        all_identical = True
+        for name, objs, fields in cases:
+            names = list(fields)
+            # Before: one getter call per field, then Flask's default jsonify encoding
+            dicts_before, items = best_of(lambda: [{name: fields[name].getter(obj) for name in names} for obj in objs])
+            encode_before, expected = best_of(lambda: reference_json.response(items).get_data())
+            dicts_after, items = best_of(lambda: serialize_many(objs, fields, names))
+            encode_after, body = best_of(lambda: app.json.response(items).get_data())
+            before = dicts_before + encode_before
+            after = dicts_after + encode_after
+            identical = body == expected
+            all_identical = all_identical and identical
+            click.echo(f"{name:<22}{len(objs):>7}"
+                       f"{dicts_before * 1000:>8.1f}{dicts_after * 1000:>8.1f}"
+                       f"{encode_before * 1000:>8.1f}{encode_after * 1000:>8.1f}"
+                       f"{before * 1000:>8.1f}{after * 1000:>8.1f}"
+                       f"{before / after:>8.1f}x  {'✅' if identical else '❌'}")
+        if not all_identical:
+            click.echo("❌ Output differs from the reference encoding")
+            sys.exit(1)
+
+@cli.command('benchmark-read-path')
+@click.option('--rows', type=int, default=100000, help='Rows per table in the scratch database')
+@click.option('--repeat', type=int, default=3, help='Runs per case (best time is reported)')
+def benchmark_read_path(rows, repeat):
+    """Compare list reads through ORM instances with Core selects into read-only row objects.
+
+    Runs on a scratch SQLite database filled with synthetic rows; the app's
+    database is not touched. Reports rows per second (fetch, and fetch +
+    serialize) and the memory held per fetched row.
+    """
+    import gc
+    import tempfile
+    import time
+    import tracemalloc
+    from flask import Flask
+    
+    cases = [
+        ('customers', Customer, CUSTOMER_SUMMARY_FIELDS),
+        ('loans', Loan, LOAN_SUMMARY_FIELDS),
+        ('interactions', CustomerInteraction, INTERACTION_FIELDS),
+    ]
+    
+    with tempfile.TemporaryDirectory() as directory:
+        scratch = Flask(__name__)
+        scratch.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(directory, 'benchmark.db')}"
+        db.init_app(scratch)
+        with scratch.app_context():
+            db.create_all()
+            click.echo(f"🌱 Inserting {rows} synthetic customers, vehicles, loans and interactions...")
+            for objs in synthetic_rows(rows)[:4]:
+                columns = [column.key for column in objs[0].__table__.columns]
+                db.session.execute(objs[0].__table__.insert(), [{key: getattr(obj, key) for key in columns} for obj in objs])
+            db.session.commit()
+            
+            def orm_rows(model, fields, names):
+                return model.query.options(*field_load_options(model, fields, names)).order_by(model.id).all()
+            
+            def core_rows(model, fields, names):
+                statement, shape = list_select(model, fields, names)
+                return read_rows(statement.order_by(model.id), shape)
+            
+            def best_of(run):
+                # Each run starts from an empty session, as a request does
+                times = []
+                for _ in range(repeat):
+                    db.session.remove()
+                    gc.collect()
+                    started = time.perf_counter()
+                    result = run()
+                    times.append(time.perf_counter() - started)
+                    del result
+                return min(times)
+            
+            def bytes_per_row(fetch, model, fields, names):
+                # Everything still allocated after the fetch: rows plus the session's identity map
+                db.session.remove()
+                gc.collect()
+                tracemalloc.start()
+                result = fetch(model, fields, names)
+                held = tracemalloc.get_traced_memory()[0]
+                tracemalloc.stop()
+                del result
+                return held / rows
+            
+            click.echo(f"{'list':<14}{'path':<6}{'fetch rows/s':>14}{'+serialize rows/s':>19}{'bytes/row':>11}")
+            all_identical = True
+            for name, model, fields in cases:
+                names = list(fields)
+                results = {}
+                for path, fetch in (('orm', orm_rows), ('core', core_rows)):
+                    fetch_seconds = best_of(lambda: fetch(model, fields, names))
+                    total_seconds = best_of(lambda: serialize_many(fetch(model, fields, names), fields, names))
+                    held = bytes_per_row(fetch, model, fields, names)
+                    db.session.remove()
+                    results[path] = serialize_many(fetch(model, fields, names), fields, names)
+                    click.echo(f"{name:<14}{path:<6}{rows / fetch_seconds:>14,.0f}{rows / total_seconds:>19,.0f}{held:>11,.0f}")
+                identical = results['orm'] == results['core']
+                all_identical = all_identical and identical
+                click.echo(f"{'':<14}{'':<6}{'identical output: ' + ('✅' if identical else '❌'):>30}")
+            db.session.remove()
+        if not all_identical:
+            click.echo("❌ Core rows serialize differently from ORM instances")
+            sys.exit(1)
+
+@cli.command('warm-cache')
+@click.option('--days-before', type=int, default=None, help='Include loans due up to N days ago')
+@click.option('--days-after', type=int, default=None, help='Include loans due in the next N days')
+def warm_cache(days_before, days_after):
+    """Run the caller profile cache warm-up and report what it loads.
+
+    The cache lives in each server process (main.py warms it on startup);
+    this command runs the same selection here to size and time the warm-up.
+    """
+    with app.app_context():
+        try:
+            loaded, seconds = warm_caller_profile_cache(days_before=days_before, days_after=days_after)
+            stats = caller_profile_cache.stats()
+            click.echo(f"🔥 Warm-up loaded {loaded} profiles in {seconds}s")
+            click.echo(f"📦 Cache size: {stats['size']} / {stats['max_entries']} entries")
+        except Exception as e:
+            click.echo(f"❌ Error warming cache: {e}")
+            sys.exit(1)
+
 if __name__ == '__main__':
     cli() 
\ No newline at end of file
@@ -0,0 +1,62 @@
+"""
+JSON encoding for responses and exports
+Uses orjson when it is installed and the standard library otherwise. orjson
+output is only used when it is byte-identical to json.dumps (ASCII-only,
+compact separators): documents with non-ASCII text, floats in exponent form
+or types orjson doesn't know are encoded by the standard library instead.
+NaN/Infinity are the one exception (orjson writes null, json writes NaN).
+"""
+
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# json.dumps writes 1e+16 / 1e-07 where orjson writes 1e16 / 1e-7, and 9e-05
+# where orjson writes 0.00009. Mapping digits to '0' turns the exponent check
+# into a substring search, several times faster than a regex over a large body.
+_DIGITS_TO_ZERO = bytes.maketrans(b'123456789E', b'000000000e')
+
+
+def orjson_dumps(obj, sort_keys=False, default=None):
+    """orjson bytes for obj when they match the standard library's output, else None"""
+    if orjson is None:
+        return None
+    option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_PASSTHROUGH_SUBCLASS
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    try:
+        data = orjson.dumps(obj, default=default, option=option)
+    except TypeError:
+        # orjson.JSONEncodeError: non-str keys, integers over 64 bits, unknown types
+        return None
+    if not data.isascii() or b'0.0000' in data or b'0e' in data.translate(_DIGITS_TO_ZERO):
+        return None
+    return data
+
+
+def dumps_compact(obj, sort_keys=False, default=None):
+    """Compact JSON text, as json.dumps(obj, separators=(',', ':')) writes it"""
+    data = orjson_dumps(obj, sort_keys, default)
+    if data is not None:
+        return data.decode('ascii')
+    return json.dumps(obj, default=default, sort_keys=sort_keys, separators=(',', ':'))
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask's default provider, with jsonify() encoded by orjson when the output is identical"""
+
+    def response(self, *args, **kwargs):
+        if self.compact is False or (self.compact is None and self._app.debug) or not self.ensure_ascii:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        data = orjson_dumps(obj, self.sort_keys, self.default)
+        if data is None:
+            return self._app.response_class(
+                f"{self.dumps(obj, separators=(',', ':'))}\n", mimetype=self.mimetype
+            )
+        return self._app.response_class(data + b'\n', mimetype=self.mimetype)
@@ -15,12 +15,37 @@ def create_tables():
             db.create_all()
             print("✅ Database tables created successfully!")
             
+            from app import upgrade_schema
+            for change in upgrade_schema():
+                print(f"🔧 Schema upgrade: added {change}")
+            
             # Check customer count
-            from app import Customer, Loan, CustomerInteraction
+            from app import (Customer, Loan, CustomerInteraction, CustomerPhoneNumber, CallerCard,
+                             rebuild_phone_index, rebuild_caller_cards, load_known_caller_filter,
+                             start_caller_cache_warmup, call_outcome_worker)
             customer_count = Customer.query.count()
             print(f"📊 Found {customer_count} customers in database")
             if customer_count == 0:
                 print("📝 No customers found. You can create customers via the API.")
+            elif CustomerPhoneNumber.query.first() is None:
+                # Databases created before the phone index existed
+                written = rebuild_phone_index()
+                print(f"📇 Built phone index with {written} numbers")
+            if customer_count and CallerCard.query.first() is None:
+                written = rebuild_caller_cards()
+                print(f"🪪 Built {written} caller cards")
+            
+            if app.config['KNOWN_CALLER_FILTER_ENABLED']:
+                filter_stats = load_known_caller_filter()
+                print(f"🧮 Known caller filter: {filter_stats.get('numbers', 0)} numbers, "
+                      f"{filter_stats.get('memory_bytes', 0)} bytes")
+            
+            if customer_count and app.config['CALLER_CACHE_WARMUP_ON_STARTUP']:
+                # Runs in the background; the server starts accepting calls immediately
+                start_caller_cache_warmup()
+            
+            # Drain post-call outcomes queued before a restart
+            call_outcome_worker.start()
                 
         except Exception as e:
             print(f"❌ Error creating database tables: {e}")
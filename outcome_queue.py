@@ -0,0 +1,271 @@
+"""
+Durable local queue for asynchronous post-call outcome ingestion
+Payloads are journaled to a local SQLite file before the webhook is
+acknowledged, then applied in batches by background worker threads.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outcome_queue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ticket_id TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    enqueued_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    status_code INTEGER,
+    response TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_outcome_queue_status ON outcome_queue (status, id);
+"""
+
+
+class QueuedOutcome:
+    __slots__ = ('id', 'ticket_id', 'payload', 'attempts', 'enqueued_at')
+
+    def __init__(self, id, ticket_id, payload, attempts, enqueued_at):
+        self.id = id
+        self.ticket_id = ticket_id
+        self.payload = payload
+        self.attempts = attempts
+        self.enqueued_at = enqueued_at
+
+
+class OutcomeQueue:
+    """
+    SQLite-backed journal of outcome payloads.
+
+    Ticket lifecycle: queued -> processing -> done | failed. Items left in
+    'processing' by a crashed worker are put back with release_stale().
+    The journal file (and its directory) is only created on first use.
+    """
+
+    def __init__(self, path, max_attempts=5):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._created = False
+        self._lock = threading.Lock()
+
+    def _create(self):
+        with self._lock:
+            if self._created:
+                return
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with closing(self._open()) as conn:
+                conn.executescript(SCHEMA)
+            self._created = True
+
+    def _connect(self):
+        if not self._created:
+            self._create()
+        return self._open()
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=FULL')
+        return conn
+
+    def enqueue(self, payload):
+        """Durably append a payload; returns its ticket id"""
+        ticket_id = uuid.uuid4().hex
+        with closing(self._connect()) as conn:
+            conn.execute(
+                'INSERT INTO outcome_queue (ticket_id, payload, enqueued_at) VALUES (?, ?, ?)',
+                (ticket_id, json.dumps(payload), time.time())
+            )
+        return ticket_id
+
+    def claim(self, batch_size):
+        """Atomically move up to batch_size queued items to 'processing' and return them"""
+        with closing(self._connect()) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            rows = conn.execute(
+                "SELECT id, ticket_id, payload, attempts, enqueued_at FROM outcome_queue "
+                "WHERE status = 'queued' ORDER BY id LIMIT ?",
+                (batch_size,)
+            ).fetchall()
+            if rows:
+                conn.executemany(
+                    "UPDATE outcome_queue SET status = 'processing', started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                    [(time.time(), row[0]) for row in rows]
+                )
+            conn.execute('COMMIT')
+        return [
+            QueuedOutcome(row_id, ticket_id, json.loads(payload), attempts + 1, enqueued_at)
+            for row_id, ticket_id, payload, attempts, enqueued_at in rows
+        ]
+
+    def complete(self, item, status_code, response):
+        """Record the result of an applied item"""
+        status = 'done' if status_code < 500 else 'failed'
+        with closing(self._connect()) as conn:
+            conn.execute(
+                'UPDATE outcome_queue SET status = ?, finished_at = ?, status_code = ?, response = ? WHERE id = ?',
+                (status, time.time(), status_code, json.dumps(response), item.id)
+            )
+
+    def retry(self, item, error):
+        """Put an item back in the queue, or fail it once it is out of attempts"""
+        status = 'queued' if item.attempts < self.max_attempts else 'failed'
+        with closing(self._connect()) as conn:
+            conn.execute(
+                'UPDATE outcome_queue SET status = ?, error = ?, finished_at = ? WHERE id = ?',
+                (status, str(error), time.time() if status == 'failed' else None, item.id)
+            )
+
+    def release_stale(self, older_than_seconds):
+        """Requeue items a dead worker left in 'processing'; returns how many"""
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE outcome_queue SET status = 'queued' WHERE status = 'processing' AND started_at < ?",
+                (time.time() - older_than_seconds,)
+            )
+            return cursor.rowcount
+
+    def purge(self, older_than_seconds):
+        """Delete finished tickets older than the retention period"""
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "DELETE FROM outcome_queue WHERE status IN ('done', 'failed') AND finished_at < ?",
+                (time.time() - older_than_seconds,)
+            )
+            return cursor.rowcount
+
+    def get(self, ticket_id):
+        """Ticket status and result, or None for an unknown ticket"""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                'SELECT ticket_id, status, attempts, enqueued_at, started_at, finished_at, status_code, response, error '
+                'FROM outcome_queue WHERE ticket_id = ?',
+                (ticket_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        ticket_id, status, attempts, enqueued_at, started_at, finished_at, status_code, response, error = row
+        return {
+            'ticket_id': ticket_id,
+            'status': status,
+            'attempts': attempts,
+            'enqueued_at': enqueued_at,
+            'started_at': started_at,
+            'finished_at': finished_at,
+            'status_code': status_code,
+            'result': json.loads(response) if response else None,
+            'error': error
+        }
+
+    def stats(self):
+        """Queue depth and lag metrics"""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            counts = dict(conn.execute('SELECT status, COUNT(*) FROM outcome_queue GROUP BY status').fetchall())
+            oldest_queued = conn.execute(
+                "SELECT MIN(enqueued_at) FROM outcome_queue WHERE status IN ('queued', 'processing')"
+            ).fetchone()[0]
+            recent_lag = conn.execute(
+                "SELECT AVG(finished_at - enqueued_at), MAX(finished_at - enqueued_at) FROM ("
+                "SELECT finished_at, enqueued_at FROM outcome_queue WHERE status = 'done' "
+                "ORDER BY id DESC LIMIT 100)"
+            ).fetchone()
+        return {
+            'depth': counts.get('queued', 0) + counts.get('processing', 0),
+            'queued': counts.get('queued', 0),
+            'processing': counts.get('processing', 0),
+            'done': counts.get('done', 0),
+            'failed': counts.get('failed', 0),
+            'oldest_pending_age_seconds': round(now - oldest_queued, 3) if oldest_queued else 0.0,
+            'recent_avg_lag_seconds': round(recent_lag[0], 3) if recent_lag[0] is not None else None,
+            'recent_max_lag_seconds': round(recent_lag[1], 3) if recent_lag[1] is not None else None
+        }
+
+
+class OutcomeQueueWorker:
+    """
+    Background threads draining an OutcomeQueue.
+
+    apply_batch(items) must apply the items and return one
+    (response, status_code) pair per item, or raise to have the batch retried.
+    """
+
+    def __init__(self, queue, apply_batch, threads=1, batch_size=50, poll_seconds=0.5,
+                 stale_seconds=300, retention_seconds=72 * 3600):
+        self.queue = queue
+        self.apply_batch = apply_batch
+        self.threads = threads
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.stale_seconds = stale_seconds
+        self.retention_seconds = retention_seconds
+        self._wakeup = threading.Event()
+        self._started = False
+        self._lock = threading.Lock()
+        self._last_housekeeping = 0.0
+
+    @property
+    def running(self):
+        return self._started
+
+    def start(self):
+        """Start the worker threads (idempotent)"""
+        with self._lock:
+            if self._started:
+                return
+            self.queue.release_stale(self.stale_seconds)
+            for i in range(self.threads):
+                threading.Thread(target=self._run, name=f'outcome-queue-worker-{i}', daemon=True).start()
+            self._started = True
+
+    def notify(self):
+        """Wake an idle worker after an enqueue"""
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            try:
+                self._housekeeping()
+                items = self.queue.claim(self.batch_size)
+                if not items:
+                    self._wakeup.wait(self.poll_seconds)
+                    self._wakeup.clear()
+                    continue
+                self._process(items)
+            except Exception as e:
+                print(f"❌ Outcome queue worker error: {e}")
+                time.sleep(self.poll_seconds)
+
+    def _process(self, items):
+        try:
+            results = self.apply_batch(items)
+        except Exception:
+            # Retry one by one so a single bad payload doesn't hold up the batch
+            results = []
+            for item in items:
+                try:
+                    results.extend(self.apply_batch([item]))
+                except Exception as e:
+                    self.queue.retry(item, e)
+                    results.append(None)
+
+        for item, result in zip(items, results):
+            if result is not None:
+                response, status_code = result
+                self.queue.complete(item, status_code, response)
+
+    def _housekeeping(self):
+        now = time.monotonic()
+        if now - self._last_housekeeping < 60:
+            return
+        self._last_housekeeping = now
+        self.queue.release_stale(self.stale_seconds)
+        self.queue.purge(self.retention_seconds)
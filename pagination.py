@@ -0,0 +1,32 @@
+"""
+Opaque cursors for keyset pagination
+A cursor records the sort order and the sort-key values of the last row of
+a page; the next page starts strictly after those values.
+"""
+
+import base64
+import json
+from datetime import date, datetime
+
+
+def encode_cursor(order, values):
+    """Encode the sort order and last-row key values as a URL-safe token"""
+    values = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in values]
+    payload = json.dumps({'o': order, 'k': values}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, order, key_count):
+    """
+    Return the key values stored in cursor (dates as ISO strings).
+    Raises ValueError if the cursor is malformed or was issued for another order.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        cursor_order, values = payload['o'], payload['k']
+    except (ValueError, TypeError, KeyError, UnicodeError):
+        raise ValueError('Invalid cursor')
+    if cursor_order != order or not isinstance(values, list) or len(values) != key_count:
+        raise ValueError('Cursor does not match the requested order')
+    return values
@@ -0,0 +1,45 @@
+"""
+Phone number normalization for caller lookup
+Converts stored and dialed numbers to E.164 strings (e.g. +15551234567)
+"""
+
+import re
+
+DEFAULT_COUNTRY_CODE = '1'
+
+_NON_DIGITS = re.compile(r'\D')
+
+
+def normalize_phone_number(value, default_country_code=DEFAULT_COUNTRY_CODE):
+    """
+    Normalize a phone number to E.164.
+
+    Accepts integers or formatted strings ("(555) 123-4567", "+1 555 123 4567",
+    "0015551234567"). Ten-digit national numbers get the default country code.
+    Returns None when the value has no usable digits.
+    """
+    if value is None:
+        return None
+
+    digits = _NON_DIGITS.sub('', str(value))
+    if digits.startswith('00'):
+        # International dialing prefix
+        digits = digits[2:]
+    digits = digits.lstrip('0')
+    if not digits:
+        return None
+
+    if len(digits) == 10:
+        digits = default_country_code + digits
+    return '+' + digits
+
+
+def customer_phone_entries(primary_phone_number, transfer_phone_number,
+                           default_country_code=DEFAULT_COUNTRY_CODE):
+    """Return the (phone_number, source) pairs to index for a customer"""
+    entries = []
+    for value, source in ((primary_phone_number, 'primary'), (transfer_phone_number, 'transfer')):
+        phone_number = normalize_phone_number(value, default_country_code)
+        if phone_number and (phone_number, source) not in entries:
+            entries.append((phone_number, source))
+    return entries
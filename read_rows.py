@@ -0,0 +1,57 @@
+"""
+Read-only row objects for high-volume listings
+List endpoints read through Core selects executed on the session's
+connection: no ORM instances, identity map or attribute instrumentation.
+Each result row becomes an immutable named tuple (__slots__ = (), fields
+read by index), so the serializers read it the same way as a model instance.
+"""
+
+from collections import namedtuple
+
+# Row types by (name, attributes), bounded like serializers.MAX_COMPILED_SERIALIZERS
+MAX_ROW_CLASSES = 512
+
+_classes = {}
+
+
+def row_class(name, attributes):
+    """Read-only row type with the given attributes (one class per shape, cached)"""
+    key = (name, tuple(attributes))
+    cls = _classes.get(key)
+    if cls is None:
+        if len(_classes) >= MAX_ROW_CLASSES:
+            _classes.clear()
+        cls = _classes[key] = namedtuple(name, attributes)
+    return cls
+
+
+class RowShape:
+    """
+    How the flat tuples of a select map to row objects: the base columns
+    first, then for each to-one relation its primary key and columns. A
+    relation whose primary key is NULL (no related row) reads as None.
+    """
+
+    def __init__(self, name, columns, relations=()):
+        self.columns = list(columns)
+        # (attribute, row type, start, end) of each relation's values in the flat tuple
+        self.relations = []
+        position = len(self.columns)
+        for attribute, related_name, related_columns in relations:
+            related = row_class(related_name, related_columns)
+            self.relations.append((attribute, related, position, position + len(related_columns)))
+            position += len(related_columns)
+        self.row_class = row_class(name, [*self.columns, *(attribute for attribute, *_ in self.relations)])
+
+    def rows(self, values):
+        """Row objects for an iterable of flat result tuples"""
+        make = self.row_class._make
+        if not self.relations:
+            return list(map(make, values))
+        width = len(self.columns)
+        relations = [(related._make, start, end) for attribute, related, start, end in self.relations]
+        return [
+            make((*row[:width], *(None if row[start] is None else related(row[start:end])
+                                  for related, start, end in relations)))
+            for row in values
+        ]
@@ -0,0 +1,118 @@
+"""
+Response serializers
+A field map describes each output key of a resource: how to compute it,
+the columns it reads and the relations it loads. For a given selection of
+keys the map is compiled once into a plain function returning the dict in a
+single pass (inline attribute reads and date formatting, no per-field calls).
+Loaded ORM columns are read straight from the instance __dict__, skipping the
+attribute descriptors; unloaded or expired ones go through normal attribute
+access so lazy loading still applies.
+"""
+
+from sqlalchemy import Date, DateTime
+
+# Compiled serializers by (field map, selected names); sparse fieldsets make
+# the selections client-controlled, so the cache is bounded
+MAX_COMPILED_SERIALIZERS = 512
+
+_compiled = {}
+
+
+class SerializedField:
+    """One response field: how to compute it, the columns it reads and any relation it loads.
+
+    Fields reading one attribute can give it and an expression, the Python
+    source computing the output from `{value}` (the attribute's value), which
+    the compiler inlines; other fields are computed by calling getter.
+    Fields reading a to-one relation name it in related as (relationship
+    name, columns) so list queries can select those columns without the ORM.
+    """
+    __slots__ = ('getter', 'columns', 'load_options', 'attribute', 'expression', 'related')
+
+    def __init__(self, getter, columns=(), load_options=None, attribute=None, expression=None, related=None):
+        self.getter = getter
+        self.columns = columns
+        self.load_options = load_options or (lambda: ())
+        self.attribute = attribute
+        self.expression = expression
+        self.related = related
+
+
+def iso(value):
+    return value.isoformat() if value else None
+
+
+def column_field(attribute):
+    return SerializedField(lambda obj: getattr(obj, attribute), (attribute,), attribute=attribute, expression="{value}")
+
+
+def date_field(attribute):
+    return SerializedField(
+        lambda obj: iso(getattr(obj, attribute)),
+        (attribute,),
+        attribute=attribute,
+        expression="(value.isoformat() if (value := {value}) else None)"
+    )
+
+
+def column_fields(*names):
+    return {name: column_field(name) for name in names}
+
+
+def date_fields(*names):
+    return {name: date_field(name) for name in names}
+
+
+def model_fields(model, exclude=()):
+    """Field map with every column of model, in table order (dates as ISO 8601 strings)"""
+    return {
+        column.key: date_field(column.key) if isinstance(column.type, (Date, DateTime)) else column_field(column.key)
+        for column in model.__table__.columns
+        if column.key not in exclude
+    }
+
+
+def compile_serializer(fields, names):
+    """Build the function mapping an object to {name: value} for the selected names"""
+    namespace = {}
+    from_dict, from_attributes = [], []
+    for i, name in enumerate(names):
+        field = fields[name]
+        if field.attribute is not None:
+            from_dict.append(f"{name!r}: {field.expression.format(value=f'values[{field.attribute!r}]')}")
+            from_attributes.append(f"{name!r}: {field.expression.format(value=f'obj.{field.attribute}')}")
+        else:
+            namespace[f'_get{i}'] = field.getter
+            from_dict.append(f"{name!r}: _get{i}(obj)")
+            from_attributes.append(f"{name!r}: _get{i}(obj)")
+    source = (
+        "def serialize(obj):\n"
+        "    values = getattr(obj, '__dict__', None)\n"
+        "    if values is not None:\n"
+        "        try:\n"
+        "            return {" + ", ".join(from_dict) + "}\n"
+        "        except KeyError:\n"
+        "            pass\n"
+        "    return {" + ", ".join(from_attributes) + "}\n"
+    )
+    exec(compile(source, '<serializer>', 'exec'), namespace)
+    return namespace['serialize']
+
+
+def serializer_for(fields, names):
+    """The compiled serializer for names of the fields map (compiled on first use)"""
+    key = (id(fields), tuple(names))
+    cached = _compiled.get(key)
+    if cached is None or cached[0] is not fields:
+        if len(_compiled) >= MAX_COMPILED_SERIALIZERS:
+            _compiled.clear()
+        cached = _compiled[key] = (fields, compile_serializer(fields, names))
+    return cached[1]
+
+
+def serialize(obj, fields, names):
+    return serializer_for(fields, names)(obj)
+
+
+def serialize_many(objs, fields, names):
+    return list(map(serializer_for(fields, names), objs))
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Query-count regression test for the loan/customer read endpoints and dashboard
+Seeds a throwaway SQLite database with 10k loans and asserts each request
+runs a fixed number of SQL statements (no per-row lazy loads).
+
+Run with: python -m pytest test_query_counts.py
+"""
+
+import os
+import tempfile
+from datetime import date, datetime
+
+# Configure a throwaway database before the app module is imported
+_tmpdir = tempfile.mkdtemp(prefix='crm-query-counts-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmpdir, 'crm.db')}"
+os.environ['POST_CALL_QUEUE_PATH'] = os.path.join(_tmpdir, 'post_call_queue.db')
+
+import pytest
+from sqlalchemy import event
+
+from app import (app, db, Customer, Loan, Vehicle, CustomerInteraction, dashboard_cache, reconcile_portfolio_counters,
+                 caller_profile_cache, pre_call_success_response, rebuild_phone_index, rebuild_caller_cards,
+                 warm_caller_profile_cache)
+
+CUSTOMERS = 1000
+VEHICLES = 100
+LOANS = 10000
+INTERACTIONS = 30
+
+
+@pytest.fixture(scope='module')
+def client():
+    with app.app_context():
+        db.create_all()
+        now = datetime.utcnow()
+        db.session.execute(db.insert(Customer), [{
+            'id': i,
+            'account_number': f'{9000000000 + i}',
+            'first_name': f'First{i}',
+            'last_name': f'Last{i}',
+            'primary_phone_number': 5550000000 + i,
+            'created_at': now
+        } for i in range(1, CUSTOMERS + 1)])
+        db.session.execute(db.insert(Vehicle), [{
+            'id': i,
+            'vin': f'VIN{i:014d}',
+            'make': 'Make',
+            'model': f'Model{i}',
+            'year': 2015 + i % 10
+        } for i in range(1, VEHICLES + 1)])
+        db.session.execute(db.insert(Loan), [{
+            'id': i,
+            'customer_id': 1 + i % CUSTOMERS,
+            'vehicle_id': 1 + i % VEHICLES if i % 3 else None,
+            'product_name': 'Auto Loan',
+            'due_amount': 100.0,
+            'contractual_installment_amount': 350.0,
+            'interest_late_fee': 25.0,
+            'minimum_amount': 75.0,
+            'due_date': date(2024, 1, 1),
+            'status': 'active',
+            'created_at': now
+        } for i in range(1, LOANS + 1)])
+        db.session.execute(db.insert(CustomerInteraction), [{
+            'customer_id': 1,
+            'creation_date': now,
+            'last_updated_date': now.date(),
+            'source': 'Phone Call',
+            'status': 'Completed'
+        } for _ in range(INTERACTIONS)])
+        db.session.commit()
+        # Core inserts bypass the counter hooks, as a bulk load would
+        with db.engine.begin() as conn:
+            reconcile_portfolio_counters(conn)
+    return app.test_client()
+
+
+def count_queries(client, url):
+    """Return (response, number of SQL statements executed while serving url)"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    return response, len(statements)
+
+
+def test_loans_listing_all_is_one_query(client):
+    response, queries = count_queries(client, '/api/loans?all=true')
+    assert response.status_code == 200
+    assert len(response.json) == LOANS
+    assert response.json[0]['customer'] == 'First2 Last2'
+    assert queries == 1
+
+
+def test_loans_page_is_one_query(client):
+    response, queries = count_queries(client, '/api/loans?limit=1000')
+    assert response.status_code == 200
+    assert len(response.json['loans']) == 1000
+    assert queries == 1
+
+
+def test_loan_detail_is_constant(client):
+    response, queries = count_queries(client, '/api/loans/5')
+    assert response.status_code == 200
+    assert response.json['vehicle'] is not None
+    # ETag version lookup + loan with customer and vehicle
+    assert queries == 2
+
+
+def test_customer_detail_is_constant(client):
+    response, queries = count_queries(client, '/api/customers/1')
+    assert response.status_code == 200
+    assert len(response.json['loans']) == LOANS // CUSTOMERS
+    assert len(response.json['interactions']) == app.config['CUSTOMER_DETAIL_INTERACTIONS_LIMIT']
+    assert response.json['interactions_total'] == INTERACTIONS
+    assert response.json['interactions_next_cursor'] is not None
+    # ETag version lookup + customer + loans + recent interactions with their count
+    assert queries == 4
+
+
+def test_interaction_pages_continue_customer_detail(client):
+    detail = client.get('/api/customers/1').json
+    response, queries = count_queries(
+        client, f"/api/customers/1/interactions?after={detail['interactions_next_cursor']}"
+    )
+    assert response.status_code == 200
+    embedded = [interaction['id'] for interaction in detail['interactions']]
+    paged = [interaction['id'] for interaction in response.json['interactions']]
+    assert len(embedded) + len(paged) == INTERACTIONS
+    assert not set(embedded) & set(paged)
+    assert response.json['next_cursor'] is None
+    # Customer existence check + one page of interactions
+    assert queries == 2
+
+
+def test_dashboard_stats_is_one_query_then_cached(client):
+    dashboard_cache.invalidate()
+    response, queries = count_queries(client, '/api/dashboard-stats')
+    assert response.status_code == 200
+    assert response.json['total_customers'] == CUSTOMERS
+    assert response.json['total_loans'] == LOANS
+    assert response.json['active_loans'] == LOANS
+    assert queries == 1
+    # Served from the cache until DASHBOARD_CACHE_TTL_SECONDS passes
+    response, queries = count_queries(client, '/api/dashboard-stats')
+    assert response.status_code == 200
+    assert queries == 0
+
+
+def test_dashboard_counters_follow_writes(client):
+    response = client.post('/api/customers', json={'account_number': 'COUNTERS-1', 'first_name': 'Count'})
+    assert response.status_code == 201
+    dashboard_cache.invalidate()
+    assert client.get('/api/dashboard-stats').json['total_customers'] == CUSTOMERS + 1
+    with app.app_context(), db.engine.connect() as conn:
+        assert reconcile_portfolio_counters(conn) == {}
+
+
+def test_nullable_sort_pages_keep_null_rows(client):
+    # Six loans of their own product; three without a grace period date
+    grace_dates = {1: date(2024, 2, 1), 2: None, 3: date(2024, 1, 1), 4: None, 5: date(2024, 2, 1), 6: None}
+    with app.app_context():
+        for loan_id, grace_period_date in grace_dates.items():
+            db.session.execute(db.update(Loan).where(Loan.id == loan_id).values(
+                product_name='Grace Test', grace_period_date=grace_period_date
+            ))
+        db.session.commit()
+    expected = {
+        'grace_period_date': [3, 1, 5, 2, 4, 6],
+        '-grace_period_date': [5, 1, 3, 6, 4, 2]
+    }
+    for order, ids in expected.items():
+        url = f"/api/loans?product=Grace Test&order={order}"
+        legacy = [loan['id'] for loan in client.get(f"{url}&all=true").json]
+        paged, after = [], ''
+        while True:
+            page = client.get(f"{url}&limit=2&after={after}").json
+            paged += [loan['id'] for loan in page['loans']]
+            after = page['next_cursor']
+            if after is None:
+                break
+        assert paged == legacy == ids
+
+
+def test_caller_card_owner_change_drops_cached_profile(client):
+    url = '/api/fetch_user_profile_pre_call/?caller_number=5551112222'
+    response = client.post('/api/customers', json={
+        'account_number': 'OWNER-A', 'first_name': 'Transfer', 'primary_phone_number': 5553334444,
+        'transfer_phone_number': 5551112222
+    })
+    assert response.status_code == 201
+    assert client.get(url).json['caller_details'][0]['user_info']['first_name'] == 'Transfer'
+    # A primary number wins the card over another customer's transfer number
+    response = client.post('/api/customers', json={
+        'account_number': 'OWNER-B', 'first_name': 'Primary', 'primary_phone_number': 5551112222
+    })
+    assert response.status_code == 201
+    assert client.get(url).json['caller_details'][0]['user_info']['first_name'] == 'Primary'
+
+
+def test_warmup_keeps_loading_after_a_concurrent_write(client, monkeypatch):
+    calls = []
+
+    def build_and_write(row):
+        calls.append(row.phone_number)
+        if len(calls) == 150:
+            # A write committed mid-warm-up, to a customer not cached yet
+            db.session.get(Customer, row.customer_id).first_name = 'Rewarmed'
+            db.session.commit()
+        return pre_call_success_response(row)
+
+    with app.app_context():
+        # The seed data bypassed the phone index
+        rebuild_phone_index()
+        rebuild_caller_cards()
+        caller_profile_cache.clear()
+        monkeypatch.setattr('app.pre_call_success_response', build_and_write)
+        loaded, seconds = warm_caller_profile_cache(days_before=0, days_after=0, today=date(2024, 1, 1), chunk_size=100)
+    # Only the fills of the chunk read before the write (rows 150-200) are dropped
+    assert len(calls) == CUSTOMERS
+    assert loaded == caller_profile_cache.stats()['size']
+    assert loaded == CUSTOMERS - 51
+    assert caller_profile_cache.get(calls[-1]) is not None
@@ -47,13 +47,13 @@ def test_replit_deployment():
             'name': 'Customers API',
             'url': f'{base_url}/api/customers',
             'method': 'GET',
-            'expected_type': list
+            'expected_keys': ['customers', 'next_cursor', 'limit']
         },
         {
             'name': 'Loans API',
             'url': f'{base_url}/api/loans',
             'method': 'GET',
-            'expected_type': list
+            'expected_keys': ['loans', 'next_cursor', 'limit']
         },
         {
             'name': 'Pre-Call Profile',
@@ -0,0 +1,91 @@
+"""
+Single-value TTL cache with single-flight refresh
+Holds one computed value (e.g. the dashboard aggregate) for a few seconds.
+When it is missing or expired, the first caller computes it and every
+concurrent caller waits for that result instead of running the computation
+again, so a burst of requests costs at most one computation per process.
+"""
+
+import threading
+import time
+
+
+class SingleFlightCache:
+    """Thread-safe cache of one value, refreshed by at most one caller at a time.
+
+    A failed computation is not cached: the callers waiting on it get the
+    same exception and the next call tries again.
+    """
+
+    def __init__(self, ttl_seconds=10):
+        self.ttl_seconds = ttl_seconds
+        self._value = None
+        self._expires_at = 0.0
+        self._flight = None  # (done event, [value, exception]) of the running computation
+        self._lock = threading.Lock()
+        self._version = 0
+        self._stats = {
+            'hits': 0,
+            'loads': 0,
+            'coalesced': 0,
+            'errors': 0,
+            'invalidations': 0
+        }
+
+    def get(self, compute):
+        """Return the cached value, calling compute() to refresh it if missing or expired"""
+        with self._lock:
+            if self._expires_at > time.monotonic():
+                self._stats['hits'] += 1
+                return self._value
+            flight = self._flight
+            leader = flight is None
+            if leader:
+                flight = self._flight = (threading.Event(), [None, None])
+                version = self._version
+                self._stats['loads'] += 1
+            else:
+                self._stats['coalesced'] += 1
+
+        done, outcome = flight
+        if not leader:
+            done.wait()
+            if outcome[1] is not None:
+                raise outcome[1]
+            return outcome[0]
+
+        try:
+            value = compute()
+        except Exception as e:
+            outcome[1] = e
+            with self._lock:
+                self._flight = None
+                self._stats['errors'] += 1
+            done.set()
+            raise
+
+        outcome[0] = value
+        with self._lock:
+            self._flight = None
+            # Not cached if invalidated while computing: the value may predate the change
+            if self.ttl_seconds > 0 and version == self._version:
+                self._value = value
+                self._expires_at = time.monotonic() + self.ttl_seconds
+        done.set()
+        return value
+
+    def invalidate(self):
+        """Drop the cached value; the next get() recomputes it"""
+        with self._lock:
+            self._value = None
+            self._expires_at = 0.0
+            self._version += 1
+            self._stats['invalidations'] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._stats,
+                'ttl_seconds': self.ttl_seconds,
+                'cached': self._expires_at > time.monotonic()
+            }